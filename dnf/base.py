@@ -679,6 +679,43 @@ class Base(object):
         del self._priv_ts
         self._priv_ts = None
 
+    @staticmethod
+    def _comps_cache_key(comps_repos):
+        """Identify the comps files the merged comps would be built from."""
+        key = []
+        for repo, comps_fn in comps_repos:
+            try:
+                stat = os.stat(comps_fn)
+            except OSError:
+                return None
+            key.append([repo.id, comps_fn, int(stat.st_mtime), stat.st_size])
+        return key
+
+    def _add_repo_comps(self, repo, comps_fn):
+        logger.log(dnf.logging.DDEBUG,
+                   'Adding group file from repository: %s', repo.id)
+        gen_dir = os.path.join(os.path.dirname(comps_fn), 'gen')
+        gen_file = os.path.join(gen_dir, 'groups.xml')
+        temp_file = None
+        try:
+            if not os.path.exists(gen_dir):
+                os.makedirs(gen_dir, mode=0o755)
+            misc.decompress(comps_fn, dest=gen_file, check_timestamps=True)
+        except (PermissionError, dnf.exceptions.MiscError):
+            temp_file = tempfile.NamedTemporaryFile()
+            gen_file = temp_file.name
+            misc.decompress(comps_fn, dest=gen_file, check_timestamps=False)
+        try:
+            self._comps._add_from_xml_filename(gen_file)
+        except dnf.exceptions.CompsError as e:
+            msg = _('Failed to add groups file for repository: %s - %s')
+            logger.critical(msg, repo.id, e)
+            return False
+        finally:
+            if temp_file:
+                temp_file.close()
+        return True
+
     def read_comps(self, arch_filter=False):
         # :api
         """Create the groups object to access the comps metadata."""
@@ -686,6 +723,7 @@ class Base(object):
         self._comps = dnf.comps.Comps()
 
         logger.log(dnf.logging.DDEBUG, 'Getting group metadata')
+        comps_repos = []
         for repo in self.repos.iter_enabled():
             if not repo.enablegroups:
                 continue
@@ -694,34 +732,59 @@ class Base(object):
             comps_fn = repo._repo.getCompsFn()
             if not comps_fn:
                 continue
+            comps_repos.append((repo, comps_fn))
 
-            logger.log(dnf.logging.DDEBUG,
-                       'Adding group file from repository: %s', repo.id)
-            gen_dir = os.path.join(os.path.dirname(comps_fn), 'gen')
-            gen_file = os.path.join(gen_dir, 'groups.xml')
-            temp_file = None
+        persistor = dnf.persistor.CompsPersistor(self.conf.cachedir)
+        key = self._comps_cache_key(comps_repos)
+        cached_fn = persistor.get(key) if key else None
+        if cached_fn:
+            logger.log(dnf.logging.DDEBUG, 'Loading cached group metadata')
             try:
-                if not os.path.exists(gen_dir):
-                    os.makedirs(gen_dir, mode=0o755)
-                misc.decompress(comps_fn, dest=gen_file, check_timestamps=True)
-            except (PermissionError, dnf.exceptions.MiscError):
-                temp_file = tempfile.NamedTemporaryFile()
-                gen_file = temp_file.name
-                misc.decompress(comps_fn, dest=gen_file, check_timestamps=False)
-            try:
-                self._comps._add_from_xml_filename(gen_file)
-            except dnf.exceptions.CompsError as e:
-                msg = _('Failed to add groups file for repository: %s - %s')
-                logger.critical(msg, repo.id, e)
-            if temp_file:
-                temp_file.close()
+                self._comps._add_from_xml_filename(cached_fn)
+            except (dnf.exceptions.CompsError, IOError, OSError) as e:
+                # a process saving a newer snapshot may have removed this one
+                logger.debug('Failed to load comps cache: %s', e)
+                cached_fn = None
+
+        if not cached_fn:
+            failed = False
+            for repo, comps_fn in comps_repos:
+                if not self._add_repo_comps(repo, comps_fn):
+                    failed = True
+            if key and not failed:
+                persistor.save(key, self._comps)
 
         if arch_filter:
-            self._comps._i.arch_filter(
+            self._comps._arch_filter(
                 [self._conf.substitutions['basearch']])
         timer()
         return self._comps
 
+    def _advisory_cache_key(self):
+        """Identify the updateinfo metadata of enabled repos and the rpmdb state."""
+        key = [self._ts.dbCookie(), os.uname()[2]]
+        for repo in sorted(self.repos.iter_enabled(), key=lambda r: r.id):
+            path = repo.get_metadata_path('updateinfo')
+            if path and os.path.exists(path):
+                stat = os.stat(path)
+                key.append([repo.id, path, int(stat.st_mtime), stat.st_size])
+        return key
+
+    def _refresh_advisory_cache(self):
+        """Compute advisories applicable to the installed packages and store them."""
+        apkg_adv_insts = dnf.query._available_apkg_adv_insts(self.sack)
+        persistor = dnf.persistor.AdvisoryPersistor(self.conf.cachedir)
+        persistor.save(self._advisory_cache_key(), apkg_adv_insts)
+        return apkg_adv_insts
+
+    def _applicable_advisories(self):
+        """Return the cached applicable advisories, refreshing a stale cache."""
+        persistor = dnf.persistor.AdvisoryPersistor(self.conf.cachedir)
+        apkg_adv_insts = persistor.get(self._advisory_cache_key())
+        if apkg_adv_insts is None:
+            apkg_adv_insts = self._refresh_advisory_cache()
+        return apkg_adv_insts
+
     def _getHistory(self):
         """auto create the history object that to access/append the transaction
            history information. """
@@ -738,10 +801,16 @@ class Base(object):
 
     def _goal2transaction(self, goal):
         ts = self.history.rpm
+        with ts._cached_reasons():
+            self._fill_goal_transaction(goal, ts)
+        return ts
+
+    def _fill_goal_transaction(self, goal, ts):
         all_obsoleted = set(goal.list_obsoleted())
         installonly_query = self._get_installonly_query()
         installonly_query.apply()
-        installonly_query_installed = installonly_query.installed().apply()
+        installonly_pkgs = set(installonly_query)
+        installonly_installed_names = set(pkg.name for pkg in installonly_query.installed())
 
         for pkg in goal.list_downgrades():
             obs = goal.obsoleted_by_package(pkg)
@@ -776,7 +845,7 @@ class Base(object):
             #  Inherit reason if package is installonly an package with same name is installed
             #  Use the same logic like upgrade
             #  Upgrade of installonly packages result in install or install and remove step
-            if pkg in installonly_query and installonly_query_installed.filter(name=pkg.name):
+            if pkg in installonly_pkgs and pkg.name in installonly_installed_names:
                 reason = ts.get_reason(pkg)
 
             # inherit the best reason from obsoleted packages
@@ -808,7 +877,7 @@ class Base(object):
 
             cb = lambda pkg: self._ds_callback.pkg_added(pkg, 'od')
             dnf.util.mapall(cb, obs)
-            if pkg in installonly_query:
+            if pkg in installonly_pkgs:
                 ts.add_install(pkg, obs)
             else:
                 ts.add_upgrade(pkg, upgraded, obs)
@@ -818,17 +887,15 @@ class Base(object):
         if erasures:
             remaining_installed_query = self.sack.query(flags=hawkey.IGNORE_EXCLUDES).installed()
             remaining_installed_query.filterm(pkg__neq=erasures)
-            remaining_installed_query.apply()
+            remaining_installed = remaining_installed_query._na_dict()
             for pkg in erasures:
-                tmp_remaining_installed_query = remaining_installed_query.filter(name=pkg.name, arch=pkg.arch)
-                if tmp_remaining_installed_query:
-                    remaining = tmp_remaining_installed_query[0]
-                    ts.get_reason(remaining)
+                remaining = remaining_installed.get((pkg.name, pkg.arch))
+                if remaining:
+                    remaining = remaining[0]
                     self.history.set_reason(remaining, ts.get_reason(remaining))
                 self._ds_callback.pkg_added(pkg, 'e')
                 reason = goal.get_reason(pkg)
                 ts.add_erase(pkg, reason)
-        return ts
 
     def _query_matches_installed(self, q):
         """ See what packages in the query match packages (also in older
@@ -1198,14 +1265,16 @@ class Base(object):
         timer = dnf.logging.Timer('verify transaction')
         count = 0
 
-        rpmdb_sack = dnf.sack.rpmdb_sack(self)
-
-        # mark group packages that are installed on the system as installed in the db
-        q = rpmdb_sack.query().installed()
-        names = set([i.name for i in q])
-        for ti in self.history.group:
-            g = ti.getCompsGroupItem()
-            for p in g.getPackages():
+        # mark group packages that are installed on the system as installed in the db,
+        # only the packages not marked yet are looked up and written; loading the rpmdb
+        # sack is the expensive part, so it is done only when there is something to mark
+        group_pkgs = [p for ti in self.history.group
+                      for p in ti.getCompsGroupItem().getPackages() if not p.getInstalled()]
+        if group_pkgs:
+            rpmdb_sack = dnf.sack.rpmdb_sack(self)
+            q = rpmdb_sack.query().installed().filterm(name=[p.getName() for p in group_pkgs])
+            names = set(i.name for i in q)
+            for p in group_pkgs:
                 if p.getName() in names:
                     p.setInstalled(True)
                     p.save()
@@ -1668,13 +1737,13 @@ class Base(object):
         trans = self._comps_trans
         basearch = self.conf.substitutions['basearch']
 
-        def trans_upgrade(query, remove_query, comps_pkg):
+        def trans_upgrade(query, remove_pkgs, comps_pkg):
             sltr = dnf.selector.Selector(self.sack)
             sltr.set(pkg=query)
             self._goal.upgrade(select=sltr)
-            return remove_query
+            return remove_pkgs
 
-        def trans_install(query, remove_query, comps_pkg, strict):
+        def trans_install(query, remove_pkgs, comps_pkg, strict):
             if self.conf.multilib_policy == "all":
                 if not comps_pkg.requires:
                     self._install_multiarch(query, strict=strict)
@@ -1698,40 +1767,55 @@ class Base(object):
                         # See https://bugzilla.redhat.com/show_bug.cgi?id=2176263
                         # for details of the problem.
                         if query.installed():
-                            query = query.union(self.sack.query().filterm(obsoletes=query))
+                            query = query.union(obsoleters.filter(obsoletes=query))
                         else:
-                            query = query.union(self.sack.query().filterm(
+                            query = query.union(obsoleters.filter(
                                 obsoletes=query.filter(latest_per_arch_by_priority=True)))
                     sltr.set(pkg=query)
                 self._goal.install(select=sltr, optional=not strict)
-            return remove_query
+            return remove_pkgs
 
-        def trans_remove(query, remove_query, comps_pkg):
-            remove_query = remove_query.union(query)
-            return remove_query
+        def trans_remove(query, remove_pkgs, comps_pkg):
+            remove_pkgs.extend(query)
+            return remove_pkgs
 
-        remove_query = self.sack.query().filterm(empty=True)
         attr_fn = ((trans.install, functools.partial(trans_install, strict=True)),
                    (trans.install_opt, functools.partial(trans_install, strict=False)),
                    (trans.upgrade, trans_upgrade),
                    (trans.remove, trans_remove))
 
+        # resolve all comps package names with a single query and split the
+        # result per name instead of filtering the whole sack for every name
+        names = {comps_pkg.name for (attr, fn) in attr_fn for comps_pkg in attr}
+        candidates = self.sack.query().filterm(name=list(names)).apply()
+        candidates.filterm(arch__neq=["src", "nosrc"])
+        pkgs_by_name = {}
+        for pkg in candidates:
+            pkgs_by_name.setdefault(pkg.name, []).append(pkg)
+        # the per-name obsoletes filters then only look at this small query
+        obsoleters = self.sack.query().filterm(empty=True)
+        if self.conf.obsoletes and (trans.install or trans.install_opt):
+            obsoleters = self.sack.query().filterm(obsoletes=candidates).apply()
+
+        remove_pkgs = []
         for (attr, fn) in attr_fn:
             for comps_pkg in attr:
-                query_args = {'name': comps_pkg.name}
-                if (comps_pkg.basearchonly):
-                    query_args.update({'arch': basearch})
-                q = self.sack.query().filterm(**query_args).apply()
-                q.filterm(arch__neq=["src", "nosrc"])
-                if not q:
+                pkgs = pkgs_by_name.get(comps_pkg.name, [])
+                if comps_pkg.basearchonly:
+                    pkgs = [pkg for pkg in pkgs if pkg.arch == basearch]
+                if not pkgs:
                     package_string = comps_pkg.name
                     if comps_pkg.basearchonly:
                         package_string += '.' + basearch
                     logger.warning(_('No match for group package "{}"').format(package_string))
                     continue
-                remove_query = fn(q, remove_query, comps_pkg)
+                q = self.sack.query().filterm(pkg=pkgs)
+                remove_pkgs = fn(q, remove_pkgs, comps_pkg)
                 self._goal.group_members.add(comps_pkg.name)
 
+        remove_query = self.sack.query().filterm(empty=True)
+        if remove_pkgs:
+            remove_query = self.sack.query().filterm(pkg=remove_pkgs)
         self._remove_if_unneeded(remove_query)
 
     def _build_comps_solver(self):
@@ -23,6 +23,10 @@ from dnf.cli import commands
 
 import argparse
 import dnf.exceptions
+import dnf.persistor
+
+# bumped whenever the results stored for --incremental change their meaning
+_STATE_FORMAT = 2
 
 
 class CheckCommand(commands.Command):
@@ -50,6 +54,8 @@ class CheckCommand(commands.Command):
         parser.add_argument('--provides', dest='check_types',
                             action='append_const', const='provides',
                             help=_('show problems with provides'))
+        parser.add_argument('--incremental', action='store_true',
+                            help=_('check only packages changed since the last incremental check'))
         # Add compatibility with yum but invisible in help
         # In choices [] allows to return empty list if no argument otherwise it fails
         parser.add_argument('check_yum_types', nargs='*', choices=[
@@ -70,76 +76,217 @@ class CheckCommand(commands.Command):
             self.opts.check_types = set(self.opts.check_types)
         self.base.conf.disable_excludes += ["all"]
 
-    def run(self):
-        output_set = set()
-        q = self.base.sack.query().installed()
+    def _check_enabled(self, check_type):
+        return bool(self.opts.check_types.intersection({'all', check_type}))
+
+    def _satisfiable_rich_deps(self, rich_deps):
+        """Return the rich deps that can be satisfied by the installed packages.
+
+        Rich deps can be only tested by solver. All of them are tried in one
+        solver run first, one by one only when that fails.
+        """
+        if not rich_deps:
+            return set()
+        sack = dnf.sack.rpmdb_sack(self.base)
+
+        def solvable(deps):
+            goal = dnf.goal.Goal(sack)
+            goal.protect_running_kernel = self.base.conf.protect_running_kernel
+            for dep in deps:
+                selector = dnf.selector.Selector(sack)
+                selector.set(provides=dep)
+                goal.install(select=selector, optional=False)
+            # there ase only @system repo in sack, therefore solved is only in case
+            # when rich deps doesn't require any additional package
+            return goal.run()
+
+        if solvable(rich_deps):
+            return set(rich_deps)
+        return {dep for dep in rich_deps if solvable([dep])}
+
+    def _check_packages(self, q, pkgs):
+        """Check `pkgs` against the installed packages in `q`.
 
-        if self.opts.check_types.intersection({'all', 'dependencies'}):
-            sack = None
-            for pkg in q:
+        Return the problems found per package name, the names of packages
+        providing the requires of every checked package and the names of the
+        checked packages with rich requires. A problem is a message and the
+        arguments to highlight in it, see _format_problem().
+        """
+        problems = {}
+        depends_on = {}
+        rich_requires = set()
+
+        def add_problem(pkg, msg, *args):
+            problems.setdefault(pkg.name, set()).add((msg, tuple(str(arg) for arg in args)))
+
+        if self._check_enabled('dependencies'):
+            # every distinct reldep is resolved against the installed set once
+            providers = {}
+            missing = []
+            for pkg in pkgs:
+                provider_names = depends_on.setdefault(pkg.name, set())
                 for require in set(pkg.regular_requires) | set(set(pkg.requires_pre) - set(pkg.prereq_ignoreinst)):
-                    if str(require).startswith('rpmlib'):
+                    key = str(require)
+                    if key.startswith('rpmlib'):
                         continue
-                    if not len(q.filter(provides=[require])):
-                        if str(require).startswith('('):
-                            # rich deps can be only tested by solver
-                            if sack is None:
-                                sack = dnf.sack.rpmdb_sack(self.base)
-                            selector = dnf.selector.Selector(sack)
-                            selector.set(provides=str(require))
-                            goal = dnf.goal.Goal(sack)
-                            goal.protect_running_kernel = self.base.conf.protect_running_kernel
-                            goal.install(select=selector, optional=False)
-                            solved = goal.run()
-                            # there ase only @system repo in sack, therefore solved is only in case
-                            # when rich deps doesn't require any additional package
-                            if solved:
-                                continue
-                        msg = _("{} has missing requires of {}")
-                        output_set.add(msg.format(
-                            self.base.output.term.bold(pkg),
-                            self.base.output.term.bold(require)))
+                    if key.startswith('('):
+                        # which packages a rich dep depends on, e.g. b in
+                        # (a if b), is not known without the solver
+                        rich_requires.add(pkg.name)
+                    if key not in providers:
+                        providers[key] = {provider.name for provider in
+                                          q.filter(provides=[require]).run()}
+                    if providers[key]:
+                        provider_names.update(providers[key])
+                    else:
+                        missing.append((pkg, require))
+            satisfied_rich = self._satisfiable_rich_deps(
+                {str(require) for _pkg, require in missing if str(require).startswith('(')})
+            for pkg, require in missing:
+                if str(require) in satisfied_rich:
+                    continue
+                add_problem(pkg, _("{} has missing requires of {}"), pkg, require)
+
+            conflicted = {}
+            for pkg in pkgs:
                 for conflict in pkg.conflicts:
-                    conflicted = q.filter(provides=[conflict],
-                                          name=str(conflict).split()[0])
-                    for conflict_pkg in conflicted:
-                        msg = '{} has installed conflict "{}": {}'
-                        output_set.add(msg.format(
-                            self.base.output.term.bold(pkg),
-                            self.base.output.term.bold(conflict),
-                            self.base.output.term.bold(conflict_pkg)))
-
-        if self.opts.check_types.intersection({'all', 'duplicates'}):
+                    key = str(conflict)
+                    if key not in conflicted:
+                        conflicted[key] = q.filter(provides=[conflict], name=key.split()[0]).run()
+                    for conflict_pkg in conflicted[key]:
+                        add_problem(pkg, '{} has installed conflict "{}": {}',
+                                    pkg, conflict, conflict_pkg)
+
+        if self._check_enabled('obsoleted'):
+            obsoleted_by_reldep = {}
+            for pkg in pkgs:
+                for obsolete in pkg.obsoletes:
+                    key = str(obsolete)
+                    if key not in obsoleted_by_reldep:
+                        obsoleted_by_reldep[key] = q.filter(provides=[obsolete],
+                                                            name=key.split()[0]).run()
+                    obsoleted = obsoleted_by_reldep[key]
+                    if obsoleted:
+                        add_problem(pkg, _("{} is obsoleted by {}"), obsoleted[0], pkg)
+
+        if self._check_enabled('provides'):
+            providers = {}
+            for pkg in pkgs:
+                for provide in pkg.provides:
+                    key = str(provide)
+                    if key not in providers:
+                        providers[key] = set(q.filter(provides=[provide]).run())
+                    if pkg not in providers[key]:
+                        add_problem(pkg, _("{} provides {} but it cannot be found"),
+                                    pkg, provide)
+
+        return problems, depends_on, rich_requires
+
+    def _format_problem(self, problem):
+        msg, args = problem
+        return msg.format(*[self.base.output.term.bold(arg) for arg in args])
+
+    def _changed_since(self, state, rpmdb_version):
+        """Return names of packages changed since the check stored in `state`.
+
+        None is returned when the changes cannot be followed in the history,
+        e.g. the rpmdb was altered outside of dnf, and a full check is needed.
+        """
+        if not state or state.get('format') != _STATE_FORMAT or \
+                state.get('check_types') != sorted(self.opts.check_types):
+            return None
+        if state.get('rpmdb_version') == rpmdb_version:
+            return set()
+        changed = set()
+        last_rpmdb_version = state.get('rpmdb_version')
+        last = self.base.history.last()
+        first_tid = state.get('tid', 0) + 1
+        if last is None or last.tid < first_tid:
+            return None
+        # old() returns the newest transactions first
+        for trans in reversed(self.base.history.old(range(first_tid, last.tid + 1))):
+            if trans.beg_rpmdb_version != last_rpmdb_version:
+                return None
+            last_rpmdb_version = trans.end_rpmdb_version
+            changed.update(item.name for item in trans.packages() if item.is_package())
+        if last_rpmdb_version != rpmdb_version:
+            return None
+        return changed
+
+    def run(self):
+        q = self.base.sack.query().installed()
+        problems = {}
+        depends_on = {}
+        rich_requires = set()
+
+        if self.opts.incremental:
+            persistor = dnf.persistor.CheckPersistor(self.base.conf.cachedir)
+            state = persistor.get_last_check()
+            rpmdb_version = self.base._ts.dbCookie()
+            changed = self._changed_since(state, rpmdb_version)
+        else:
+            changed = None
+
+        if changed is None:
+            pkgs = q.run()
+        else:
+            # recheck changed packages, packages whose providers changed,
+            # packages that conflict with or obsolete the changed ones and
+            # packages with problems, which could have been fixed since
+            recheck = set(changed)
+            recheck.update(state['problems'])
+            recheck.update(name for name, provider_names in state['depends_on'].items()
+                           if changed.intersection(provider_names))
+            if changed:
+                recheck.update(state['rich_requires'])
+            pkgs = q.filter(name=list(recheck)) if recheck else q.filter(empty=True)
+            if changed:
+                changed_q = q.filter(name=list(changed))
+                pkgs = pkgs.union(q.filter(conflicts=changed_q)).union(q.filter(obsoletes=changed_q))
+            pkgs = pkgs.run()
+            recheck.update(pkg.name for pkg in pkgs)
+            problems = {name: {(msg, tuple(args)) for msg, args in name_problems}
+                        for name, name_problems in state['problems'].items()
+                        if name not in recheck}
+            depends_on = {name: set(provider_names)
+                          for name, provider_names in state['depends_on'].items()
+                          if name not in recheck}
+            rich_requires = set(state['rich_requires']).difference(recheck)
+
+        new_problems, new_depends_on, new_rich_requires = self._check_packages(q, pkgs)
+        problems.update(new_problems)
+        depends_on.update(new_depends_on)
+        rich_requires.update(new_rich_requires)
+
+        if self.opts.incremental:
+            last = self.base.history.last()
+            persistor.save({
+                'format': _STATE_FORMAT,
+                'check_types': sorted(self.opts.check_types),
+                'rpmdb_version': rpmdb_version,
+                'tid': last.tid if last else 0,
+                'problems': {name: sorted([msg, list(args)] for msg, args in name_problems)
+                             for name, name_problems in problems.items()},
+                'depends_on': {name: sorted(provider_names)
+                               for name, provider_names in depends_on.items()},
+                'rich_requires': sorted(rich_requires),
+            })
+
+        output_set = set()
+        for name_problems in problems.values():
+            output_set.update(self._format_problem(problem) for problem in name_problems)
+
+        if self._check_enabled('duplicates'):
             installonly = self.base._get_installonly_query(q)
             dups = q.duplicated().difference(installonly)._name_dict()
-            for name, pkgs in dups.items():
-                pkgs.sort()
-                for dup in pkgs[1:]:
+            for name, dup_pkgs in dups.items():
+                dup_pkgs.sort()
+                for dup in dup_pkgs[1:]:
                     msg = _("{} is a duplicate with {}").format(
-                        self.base.output.term.bold(pkgs[0]),
+                        self.base.output.term.bold(dup_pkgs[0]),
                         self.base.output.term.bold(dup))
                     output_set.add(msg)
 
-        if self.opts.check_types.intersection({'all', 'obsoleted'}):
-            for pkg in q:
-                for obsolete in pkg.obsoletes:
-                    obsoleted = q.filter(provides=[obsolete],
-                                         name=str(obsolete).split()[0])
-                    if len(obsoleted):
-                        msg = _("{} is obsoleted by {}").format(
-                            self.base.output.term.bold(obsoleted[0]),
-                            self.base.output.term.bold(pkg))
-                        output_set.add(msg)
-
-        if self.opts.check_types.intersection({'all', 'provides'}):
-            for pkg in q:
-                for provide in pkg.provides:
-                    if pkg not in q.filter(provides=[provide]):
-                        msg = _("{} provides {} but it cannot be found")
-                        output_set.add(msg.format(
-                            self.base.output.term.bold(pkg),
-                            self.base.output.term.bold(provide)))
-
         for msg in sorted(output_set):
             print(msg)
 
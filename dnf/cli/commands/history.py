@@ -24,14 +24,14 @@ import hawkey
 
 from dnf.i18n import _, ucd
 from dnf.cli import commands
-from dnf.transaction_sr import TransactionReplay, serialize_transaction
+from dnf.transaction_sr import TransactionReplay, serialize_transaction, \
+    serialize_transaction_range, store_transaction
 
 import dnf.cli
 import dnf.exceptions
 import dnf.transaction
 import dnf.util
 
-import json
 import logging
 import os
 
@@ -64,6 +64,9 @@ class HistoryCommand(commands.Command):
                             help="display history list output reversed")
         parser.add_argument("-o", "--output", default=None,
                             help=_("For the store command, file path to store the transaction to"))
+        parser.add_argument("--compact", action="store_true",
+                            help=_("For the store command, store the transaction in the compact "
+                            "gzip-compressed format"))
         parser.add_argument("--ignore-installed", action="store_true",
                             help=_("For the replay command, don't check for installed packages matching "
                             "those in transaction"))
@@ -193,25 +196,28 @@ class HistoryCommand(commands.Command):
         old = self._history_get_transaction(extcmds)
         last = self.base.history.last()
 
-        merged_trans = None
+        transactions = []
         if old.tid != last.tid:
             # history.old([]) returns all transactions and we don't want that
             # so skip merging the transactions when trying to rollback to the last transaction
             # which is the current system state and rollback is not applicable
-            for trans in self.base.history.old(list(range(old.tid + 1, last.tid + 1))):
+            transactions = self.base.history.old(list(range(old.tid + 1, last.tid + 1)))
+            for trans in transactions:
                 if trans.altered_lt_rpmdb:
                     logger.warning(_('Transaction history is incomplete, before %u.'), trans.tid)
                 elif trans.altered_gt_rpmdb:
                     logger.warning(_('Transaction history is incomplete, after %u.'), trans.tid)
 
-                if merged_trans is None:
-                    merged_trans = dnf.db.history.MergedTransactionWrapper(trans)
-                else:
-                    merged_trans.merge(trans)
-
-        self._revert_transaction(merged_trans)
+        # only the net effect of the range matters, the transactions are not
+        # merged one by one
+        data = serialize_transaction_range(transactions, self.base.sack.evr_cmp)
+        self._revert_transaction_data(data, old.tid + 1)
 
     def _revert_transaction(self, trans):
+        self._revert_transaction_data(serialize_transaction(trans), trans.tids()[0])
+
+    def _revert_transaction_data(self, data, first_tid):
+        """Revert the serialized transaction data which start with first_tid."""
         action_map = {
             "Install": "Removed",
             "Removed": "Install",
@@ -226,8 +232,6 @@ class HistoryCommand(commands.Command):
             "Reason Change": "Reason Change",
         }
 
-        data = serialize_transaction(trans)
-
         # revert actions in the serialized transaction data to perform rollback/undo
         for content_type in ("rpms", "groups", "environments"):
             for ti in data.get(content_type, []):
@@ -242,7 +246,7 @@ class HistoryCommand(commands.Command):
                     reason = self.output.history.swdb.resolveRPMTransactionItemReason(
                         nevra.name,
                         nevra.arch,
-                        trans.tids()[0] - 1
+                        first_tid - 1
                     )
                     ti["reason"] = libdnf.transaction.TransactionItemReasonToString(reason)
 
@@ -361,7 +365,9 @@ class HistoryCommand(commands.Command):
                 tid = self._history_get_transaction(tids)
                 data = serialize_transaction(tid)
                 try:
-                    filename = self.opts.output if self.opts.output is not None else "transaction.json"
+                    filename = self.opts.output
+                    if filename is None:
+                        filename = "transaction.json.gz" if self.opts.compact else "transaction.json"
 
                     # it is absolutely possible for both assumeyes and assumeno to be True, go figure
                     if (self.base.conf.assumeno or not self.base.conf.assumeyes) and os.path.isfile(filename):
@@ -371,9 +377,7 @@ class HistoryCommand(commands.Command):
                                 print(_("Not overwriting {}, exiting.").format(filename))
                                 return
 
-                    with open(filename, "w") as f:
-                        json.dump(data, f, indent=4, sort_keys=True)
-                        f.write("\n")
+                    store_transaction(data, filename, compact=self.opts.compact)
 
                     print(_("Transaction saved to {}.").format(filename))
 
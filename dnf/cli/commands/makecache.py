@@ -26,6 +26,7 @@ from dnf.i18n import _
 import argparse
 import dnf.cli
 import dnf.exceptions
+import dnf.persistor
 import dnf.util
 import logging
 
@@ -47,4 +48,11 @@ class MakeCacheCommand(commands.Command):
         timer = self.opts.timer is not None or self.opts.timer_opt
         msg = _("Making cache files for all metadata files.")
         logger.debug(msg)
-        return self.base.update_cache(timer)
+        if not self.base.update_cache(timer):
+            return False
+        # refresh advisories applicable to this system together with the
+        # metadata, but only where they have been asked for before
+        if dnf.persistor.AdvisoryPersistor(self.base.conf.cachedir).exists():
+            self.base.sack.load_system_repo(build_cache=False)
+            self.base._refresh_advisory_cache()
+        return True
@@ -25,13 +25,16 @@ from dnf.cli.option_parser import OptionParser
 
 import argparse
 import datetime
+import hashlib
 import logging
 import re
+import string
 import sys
 
 import dnf
 import dnf.cli
 import dnf.exceptions
+import dnf.query
 import dnf.subject
 import dnf.util
 import hawkey
@@ -95,6 +98,44 @@ def rpm2py_format(queryformat):
     return fmt
 
 
+_TIMESTAMP_TAGS = ('buildtime', 'installtime')
+
+
+def _format_attr(pkg, attr):
+    value = getattr(pkg, attr)
+    if attr in _TIMESTAMP_TAGS:
+        return PackageWrapper._get_timestamp(value)
+    if value is None:
+        return "(none)"
+    if isinstance(value, list):
+        return '\n'.join(sorted({dnf.i18n.ucd(reldep) for reldep in value}))
+    return dnf.i18n.ucd(value)
+
+
+def _compile_queryformat(queryformat):
+    """Compile a rpm like QUERYFMT into a function rendering a package.
+
+    The rendering function fetches every attribute used in the format only
+    once and formats it the same way as PackageWrapper does, without creating
+    the wrapper.
+    """
+    parts = []
+    for literal, field, spec, _conversion in string.Formatter().parse(rpm2py_format(queryformat)):
+        parts.append((literal, field[len('0.'):] if field is not None else None, spec))
+    attrs = {attr for _literal, attr, _spec in parts if attr is not None}
+
+    def render(pkg):
+        values = {attr: _format_attr(pkg, attr) for attr in attrs}
+        out = []
+        for literal, attr, spec in parts:
+            out.append(literal)
+            if attr is not None:
+                out.append(format(values[attr], spec))
+        return ''.join(out)
+
+    return render
+
+
 class _CommaSplitCallback(OptionParser._SplitCallback):
     SPLITTER = r'\s*,\s*'
 
@@ -109,6 +150,11 @@ class RepoQueryCommand(commands.Command):
     aliases = ('repoquery', 'rq') + tuple(nevra_forms.keys())
     summary = _('search for packages matching keyword')
 
+    def __init__(self, cli):
+        """Initialize the command."""
+        super(RepoQueryCommand, self).__init__(cli)
+        self._render_queryformat = None
+
     @staticmethod
     def filter_repo_arch(opts, query):
         """Filter query by repoid and arch options"""
@@ -229,6 +275,8 @@ class RepoQueryCommand(commands.Command):
         pkgfilter.add_argument("--unsatisfied", dest='pkgfilter',
                                const='unsatisfied', action='store_const',
                                help=_('limit the query to installed packages with unsatisfied dependencies'))
+        parser.add_argument('--stream', action='store_true',
+                            help=_('print results as soon as they are found, unsorted'))
         parser.add_argument('--location', action='store_true',
                             help=_('show a location from where packages can be downloaded'))
         package_attribute = parser.add_mutually_exclusive_group()
@@ -349,18 +397,19 @@ class RepoQueryCommand(commands.Command):
                                               dnf.i18n.ucd(chlog['text'])))
             return '\n'.join(out)
         try:
-            po = PackageWrapper(pkg)
             if opts.queryinfo:
                 return self.base.output.infoOutput(pkg)
             elif opts.queryfilelist:
-                filelist = po.files
+                filelist = PackageWrapper(pkg).files
                 if not filelist:
                     print(_('Package {} contains no files').format(pkg), file=sys.stderr)
                 return filelist
             elif opts.querysourcerpm:
-                return po.sourcerpm
+                return PackageWrapper(pkg).sourcerpm
             else:
-                return rpm2py_format(opts.queryformat).format(po)
+                if self._render_queryformat is None:
+                    self._render_queryformat = _compile_queryformat(opts.queryformat)
+                return self._render_queryformat(pkg)
         except AttributeError as e:
             # catch that the user has specified attributes
             # there don't exist on the dnf Package object.
@@ -379,58 +428,48 @@ class RepoQueryCommand(commands.Command):
 
         return resolved_nevras_query
 
-    def _do_recursive_deps(self, query_in, query_select, done=None):
-        done = done if done else query_select
-
-        query_required = query_in.filter(requires=query_select)
-
-        query_select = query_required.difference(done)
-        done = query_required.union(done)
-
-        if query_select:
-            done = self._do_recursive_deps(query_in, query_select, done=done)
-
-        return done
-
     def by_all_deps(self, names, query, all_dep_types=False):
         # in case of arguments being NEVRAs, resolve them to packages
         resolved_nevras_query = self._resolve_nevras(names, query)
 
-        # filter the arguments directly as reldeps
-        depquery = query.filter(requires__glob=names)
-
-        # filter the resolved NEVRAs as packages
-        depquery = depquery.union(query.filter(requires=resolved_nevras_query))
-
-        if all_dep_types:
-            # TODO this is very inefficient, as it resolves the `names` glob to
-            # reldeps four more times, which in a reasonably wide glob like
-            # `dnf repoquery --whatdepends "libdnf*"` can take roughly 50% of
-            # the total execution time.
-            depquery = depquery.union(query.filter(recommends__glob=names))
-            depquery = depquery.union(query.filter(enhances__glob=names))
-            depquery = depquery.union(query.filter(supplements__glob=names))
-            depquery = depquery.union(query.filter(suggests__glob=names))
-
-            depquery = depquery.union(query.filter(recommends=resolved_nevras_query))
-            depquery = depquery.union(query.filter(enhances=resolved_nevras_query))
-            depquery = depquery.union(query.filter(supplements=resolved_nevras_query))
-            depquery = depquery.union(query.filter(suggests=resolved_nevras_query))
+        # filter the arguments directly as reldeps and the resolved NEVRAs as
+        # packages, resolving the `names` glob to reldeps only once
+        dep_types = dnf.query._DEPENDENCY_TYPES if all_dep_types else ('requires',)
+        depquery = dnf.query._filter_by_deps(query, names, dep_types,
+                                             providers=resolved_nevras_query)
 
         if self.opts.recursive:
-            depquery = self._do_recursive_deps(query, depquery)
+            depquery = dnf.query.requires_closure(query, depquery)
 
         return depquery
 
-    def _get_recursive_providers_query(self, query_in, providers, done=None):
-        done = done if done else self.base.sack.query().filterm(empty=True)
-        t = self.base.sack.query().filterm(empty=True)
-        for pkg in providers.run():
-            t = t.union(query_in.filter(provides=pkg.requires))
-        query_select = t.difference(done)
-        if query_select:
-            done = self._get_recursive_providers_query(query_in, query_select, done=t.union(done))
-        return t.union(done)
+    def _resolve_deplist_providers(self, reqs):
+        """Resolve each distinct requirement to its formatted provider lines once."""
+        providers = {}
+        for req in reqs:
+            query = dnf.subject.Subject(req).get_best_query(self.base.sack)
+            query = self.filter_repo_arch(self.opts, query.available())
+            if not self.opts.verbose:
+                query = query.latest()
+            providers[req] = ['   provider: ' + str(provider) for provider in query.run()]
+        return providers
+
+    def _deplists(self, packages):
+        """Yield the --deplist output of each of the packages.
+
+        Every distinct requirement is resolved once, when it is first met.
+        """
+        providers = {}
+        for pkg in packages:
+            reqs = sorted([str(req) for req in pkg.requires])
+            providers.update(self._resolve_deplist_providers(
+                set(req for req in reqs if req not in providers)))
+            deplist_output = []
+            deplist_output.append('package: ' + str(pkg))
+            for req in reqs:
+                deplist_output.append('  dependency: ' + req)
+                deplist_output.extend(providers[req])
+            yield '\n'.join(deplist_output)
 
     def _add_add_remote_packages(self):
         rpmnames = []
@@ -534,11 +573,7 @@ class RepoQueryCommand(commands.Command):
 
         if self.opts.whatdepends:
             if (self.opts.exactdeps):
-                dependsquery = q.filter(requires__glob=self.opts.whatdepends)
-                dependsquery = dependsquery.union(q.filter(recommends__glob=self.opts.whatdepends))
-                dependsquery = dependsquery.union(q.filter(enhances__glob=self.opts.whatdepends))
-                dependsquery = dependsquery.union(q.filter(supplements__glob=self.opts.whatdepends))
-                q = dependsquery.union(q.filter(suggests__glob=self.opts.whatdepends))
+                q = dnf.query._filter_by_deps(q, self.opts.whatdepends)
             else:
                 q = self.by_all_deps(self.opts.whatdepends, q, True)
 
@@ -581,7 +616,10 @@ class RepoQueryCommand(commands.Command):
             self.tree_seed(q, orquery, self.opts)
             return
 
-        pkgs = set()
+        if self.opts.stream:
+            pkgs = _StreamedLines("\n\n" if self.opts.queryinfo or self.opts.deplist else "\n")
+        else:
+            pkgs = set()
         if self.opts.packageatr:
             rels = set()
             for pkg in q.run():
@@ -599,9 +637,7 @@ class RepoQueryCommand(commands.Command):
                     query = self.filter_repo_arch(self.opts, self.base.sack.query().available())
                 providers = query.filter(provides=rels)
                 if self.opts.recursive:
-                    providers = providers.union(
-                        self._get_recursive_providers_query(query, providers))
-                pkgs = set()
+                    providers = dnf.query.providers_closure(query, providers)
                 for pkg in providers.latest().run():
                     pkgs.add(self.build_format_fn(self.opts, pkg))
             else:
@@ -612,24 +648,15 @@ class RepoQueryCommand(commands.Command):
                 if location is not None:
                     pkgs.add(location)
         elif self.opts.deplist:
-            pkgs = []
-            for pkg in sorted(set(q.run())):
-                if self.opts.list != 'userinstalled' or self.base.history.user_installed(pkg):
-                    deplist_output = []
-                    deplist_output.append('package: ' + str(pkg))
-                    for req in sorted([str(req) for req in pkg.requires]):
-                        deplist_output.append('  dependency: ' + req)
-                        subject = dnf.subject.Subject(req)
-                        query = subject.get_best_query(self.base.sack)
-                        query = self.filter_repo_arch(
-                            self.opts, query.available())
-                        if not self.opts.verbose:
-                            query = query.latest()
-                        for provider in query.run():
-                            deplist_output.append('   provider: ' + str(provider))
-                    pkgs.append('\n'.join(deplist_output))
-            if pkgs:
-                print('\n\n'.join(pkgs))
+            packages = [pkg for pkg in sorted(set(q.run()))
+                        if self.opts.list != 'userinstalled' or self.base.history.user_installed(pkg)]
+            if self.opts.stream:
+                pkgs.update(self._deplists(packages))
+                pkgs.close()
+            else:
+                deplists = list(self._deplists(packages))
+                if deplists:
+                    print('\n\n'.join(deplists))
             return
         elif self.opts.groupmember:
             self._group_member_report(q)
@@ -640,26 +667,23 @@ class RepoQueryCommand(commands.Command):
                 if self.opts.list != 'userinstalled' or self.base.history.user_installed(pkg):
                     pkgs.add(self.build_format_fn(self.opts, pkg))
 
-        if pkgs:
+        if self.opts.stream:
+            pkgs.close()
+        elif pkgs:
             if self.opts.queryinfo:
                 print("\n\n".join(sorted(pkgs)))
             else:
                 print("\n".join(sorted(pkgs)))
 
     def _group_member_report(self, query):
-        package_conf_dict = {}
-        for group in self.base.comps.groups:
-            package_conf_dict[group.id] = set([pkg.name for pkg in group.packages_iter()])
+        group_ids_by_name = self.base.comps._group_ids_by_package_name()
         group_package_dict = {}
         pkg_not_in_group = []
         for pkg in query.run():
-            group_id_list = []
-            for group_id, package_name_set in package_conf_dict.items():
-                if pkg.name in package_name_set:
-                    group_id_list.append(group_id)
-            if group_id_list:
+            group_ids = group_ids_by_name.get(pkg.name)
+            if group_ids:
                 group_package_dict.setdefault(
-                    '$'.join(sorted(group_id_list)), []).append(str(pkg))
+                    '$'.join(sorted(group_ids)), []).append(str(pkg))
             else:
                 pkg_not_in_group.append(str(pkg))
         output = []
@@ -684,26 +708,85 @@ class RepoQueryCommand(commands.Command):
         reqstr = "[" + str(len(requires)) + ": " + ", ".join(requires) + "]"
         print(spacing + r"\_ " + pkg_string + " " + reqstr)
 
-    def tree_seed(self, query, aquery, opts, level=-1, usedpkgs=None):
-        for pkg in sorted(set(query.run()), key=lambda p: p.name):
-            usedpkgs = set() if usedpkgs is None or level == -1 else usedpkgs
-            if pkg.name.startswith("rpmlib") or pkg.name.startswith("solvable"):
-                return
-            self.grow_tree(level, pkg, opts)
-            if pkg not in usedpkgs:
-                usedpkgs.add(pkg)
-                if opts.packageatr:
-                    strpkg = getattr(pkg, opts.packageatr)
-                    ar = {}
-                    for name in set(strpkg):
-                        pkgquery = self.base.sack.query().filterm(provides=name)
-                        for querypkg in pkgquery:
-                            ar[querypkg.name + "." + querypkg.arch] = querypkg
-                    pkgquery = self.base.sack.query().filterm(pkg=list(ar.values()))
-                else:
-                    pkgquery = self.by_all_deps((pkg.name, ), aquery) if opts.alldeps \
-                        else aquery.filter(requires__glob=pkg.name)
-                self.tree_seed(pkgquery, aquery, opts, level + 1, usedpkgs)
+    def _tree_children(self, pkg, aquery, opts, providers_cache):
+        if opts.packageatr:
+            ar = {}
+            for reldep in set(getattr(pkg, opts.packageatr)):
+                key = str(reldep)
+                providers = providers_cache.get(key)
+                if providers is None:
+                    providers = self.base.sack.query().filterm(provides=reldep).run()
+                    providers_cache[key] = providers
+                for querypkg in providers:
+                    ar[querypkg.name + "." + querypkg.arch] = querypkg
+            children = ar.values()
+        else:
+            children = self.by_all_deps((pkg.name, ), aquery).run() if opts.alldeps \
+                else aquery.filter(requires__glob=pkg.name).run()
+        return sorted(set(children), key=lambda p: p.name)
+
+    def tree_seed(self, query, aquery, opts):
+        """Print the dependency tree of packages in `query` while walking it.
+
+        The tree is printed without being built; the walk only keeps the path
+        to the current node. Children of every visited package and providers
+        of every reldep are cached for the whole walk, so they are computed
+        once and reused wherever a subtree is shared.
+        """
+        children_cache = {}
+        providers_cache = {}
+        for seed in sorted(set(query.run()), key=lambda p: p.name):
+            usedpkgs = set()
+            stack = [(-1, iter([seed]))]
+            while stack:
+                level, siblings = stack[-1]
+                pkg = next(siblings, None)
+                if pkg is None:
+                    stack.pop()
+                    continue
+                if pkg.name.startswith("rpmlib") or pkg.name.startswith("solvable"):
+                    if level == -1:
+                        return
+                    stack.pop()
+                    continue
+                self.grow_tree(level, pkg, opts)
+                if pkg not in usedpkgs:
+                    usedpkgs.add(pkg)
+                    children = children_cache.get(pkg)
+                    if children is None:
+                        children = self._tree_children(pkg, aquery, opts, providers_cache)
+                        children_cache[pkg] = children
+                    stack.append((level + 1, iter(children)))
+
+
+class _StreamedLines(object):
+
+    """Print formatted lines as they are added instead of collecting them.
+
+    Only a fixed size digest of every printed line is kept to skip
+    duplicates.
+    """
+
+    def __init__(self, separator):
+        self._separator = separator
+        self._seen = set()
+
+    def add(self, line):
+        key = hashlib.blake2b(line.encode('utf-8'), digest_size=16).digest()
+        if key in self._seen:
+            return
+        if self._seen:
+            sys.stdout.write(self._separator)
+        self._seen.add(key)
+        sys.stdout.write(line)
+
+    def update(self, lines):
+        for line in lines:
+            self.add(line)
+
+    def close(self):
+        if self._seen:
+            sys.stdout.write("\n")
 
 
 class PackageWrapper(object):
@@ -714,12 +797,7 @@ class PackageWrapper(object):
         self._pkg = pkg
 
     def __getattr__(self, attr):
-        atr = getattr(self._pkg, attr)
-        if atr is None:
-            return "(none)"
-        if isinstance(atr, list):
-            return '\n'.join(sorted({dnf.i18n.ucd(reldep) for reldep in atr}))
-        return dnf.i18n.ucd(atr)
+        return _format_attr(self._pkg, attr)
 
     @staticmethod
     def _get_timestamp(timestamp):
@@ -728,11 +806,3 @@ class PackageWrapper(object):
             return dt.strftime("%Y-%m-%d %H:%M")
         else:
             return ''
-
-    @property
-    def buildtime(self):
-        return self._get_timestamp(self._pkg.buildtime)
-
-    @property
-    def installtime(self):
-        return self._get_timestamp(self._pkg.installtime)
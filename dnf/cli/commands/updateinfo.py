@@ -25,7 +25,9 @@ from __future__ import unicode_literals
 
 import collections
 import fnmatch
+import re
 
+import dnf.query
 import hawkey
 from dnf.cli import commands
 from dnf.cli.option_parser import OptionParser
@@ -67,7 +69,7 @@ class UpdateInfoCommand(commands.Command):
     def __init__(self, cli):
         """Initialize the command."""
         super(UpdateInfoCommand, self).__init__(cli)
-        self._installed_query = None
+        self._installed_evrs = None
 
     @staticmethod
     def set_argparser(parser):
@@ -184,10 +186,9 @@ class UpdateInfoCommand(commands.Command):
             self.display_summary(apkg_adv_insts, description)
 
     def _newer_equal_installed(self, apackage):
-        if self._installed_query is None:
-            self._installed_query = self.base.sack.query().installed().apply()
-        q = self._installed_query.filter(name=apackage.name, evr__gte=apackage.evr)
-        return len(q) > 0
+        if self._installed_evrs is None:
+            self._installed_evrs = dnf.query._installed_evrs(self.base.sack)
+        return dnf.query._newer_equal_installed(self.base.sack, self._installed_evrs, apackage)
 
     def _advisory_matcher(self, advisory):
         if not self.opts._advisory_types \
@@ -216,33 +217,42 @@ class UpdateInfoCommand(commands.Command):
                 return True
         return False
 
+    def _matching_apkg_advs(self, apkg_advs):
+        """Filter (adv. package, advisory, ...) tuples by the given options."""
+        # every advisory is matched only once, however many packages it lists
+        advisory_matches = {}
+        if self.opts.spec:
+            name_match = re.compile('|'.join(fnmatch.translate(pat) for pat in self.opts.spec)).match
+        else:
+            def name_match(name):
+                return False
+        for apkg_adv in apkg_advs:
+            apackage, advisory = apkg_adv[0], apkg_adv[1]
+            advisory_match = advisory_matches.get(advisory.id)
+            if advisory_match is None:
+                advisory_match = self._advisory_matcher(advisory)
+                advisory_matches[advisory.id] = advisory_match
+            if advisory_match or name_match(apackage.name):
+                yield apkg_adv
+
     def _apackage_advisory_installed(self, pkgs_query, cmptype, specs):
         """Return (adv. package, advisory, installed) triplets."""
-        for apackage in pkgs_query.get_advisory_pkgs(cmptype):
-            advisory = apackage.get_advisory(self.base.sack)
-            advisory_match = self._advisory_matcher(advisory)
-            apackage_match = any(fnmatch.fnmatchcase(apackage.name, pat)
-                                 for pat in self.opts.spec)
-            if advisory_match or apackage_match:
-                installed = self._newer_equal_installed(apackage)
-                yield apackage, advisory, installed
+        apkg_advs = dnf.query._apkg_advisories(self.base.sack, pkgs_query.get_advisory_pkgs(cmptype))
+        for apackage, advisory in self._matching_apkg_advs(apkg_advs):
+            yield apackage, advisory, self._newer_equal_installed(apackage)
 
     def running_kernel_pkgs(self):
         """Return query containing packages of currently running kernel"""
-        sack = self.base.sack
-        q = sack.query().filterm(empty=True)
-        kernel = sack.get_running_kernel()
-        if kernel:
-            q = q.union(sack.query().filterm(sourcerpm=kernel.sourcerpm))
-        return q
+        return dnf.query._running_kernel_pkgs(self.base.sack)
 
     def available_apkg_adv_insts(self, specs):
         """Return available (adv. package, adv., inst.) triplets"""
-        # check advisories for the latest installed packages
-        q = self.base.sack.query().installed().latest(1)
-        # plus packages of the running kernel
-        q = q.union(self.running_kernel_pkgs().installed())
-        return self._apackage_advisory_installed(q, hawkey.GT, specs)
+        if self.opts.spec_action == 'info':
+            # the cache does not keep the full advisory details
+            return self._matching_apkg_advs(dnf.query._available_apkg_adv_insts(self.base.sack))
+        # advisories applicable to the installed packages are served from
+        # the cache until the updateinfo metadata or the rpmdb changes
+        return self._matching_apkg_advs(self.base._applicable_advisories())
 
     def installed_apkg_adv_insts(self, specs):
         """Return installed (adv. package, adv., inst.) triplets"""
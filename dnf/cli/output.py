@@ -1046,6 +1046,15 @@ class Output(object):
         ins_group_msg = _('Installing group/module packages') if dnf.base.WITH_MODULES \
             else _('Installing group packages')
 
+        # build a reverse mapping to 'replaced_by'
+        # this is required to achieve reasonable speed
+        replaces = {}
+        for tsi in transaction:
+            if tsi.action != libdnf.transaction.TransactionItemAction_OBSOLETED:
+                continue
+            for i in tsi._item.getReplacedBy():
+                replaces.setdefault(i, set()).add(tsi)
+
         for (action, pkglist) in [
                 # TRANSLATORS: This is for a list of packages to be installed.
                 (C_('summary', 'Installing'), list_bunch.installed),
@@ -1063,16 +1072,6 @@ class Output(object):
                 # TRANSLATORS: This is for a list of packages to be downgraded.
                 (C_('summary', 'Downgrading'), list_bunch.downgraded)]:
             lines = []
-
-            # build a reverse mapping to 'replaced_by'
-            # this is required to achieve reasonable speed
-            replaces = {}
-            for tsi in transaction:
-                if tsi.action != libdnf.transaction.TransactionItemAction_OBSOLETED:
-                    continue
-                for i in tsi._item.getReplacedBy():
-                    replaces.setdefault(i, set()).add(tsi)
-
             for tsi in sorted(pkglist, key=lambda x: x.pkg):
                 if tsi.action not in dnf.transaction.FORWARD_ACTIONS + [libdnf.transaction.TransactionItemAction_REMOVE]:
                     continue
@@ -1271,22 +1270,19 @@ class Output(object):
                                                        (msg_size, s_wid)), u" "),
                                       '=' * output_width)]
 
+        # the lines are appended to out one by one and joined only once at the end,
+        # concatenating the messages gets slow for transactions with thousands of packages
+        hibeg, hiend = self._highlight(self.conf.color_update_installed)
+        replacing_fmt = '     ' + _('replacing') + '  %s%s%s.%s %s\n'
         for (action, lines) in pkglist_lines:
             if lines:
-                totalmsg = u"%s:\n" % action
+                out.append(u"%s:\n" % action)
             for (n, a, evr, repoid, size, obsoletes, hi) in lines:
                 columns = ((n, -n_wid, hi), (a, -a_wid),
                            (evr, -v_wid), (repoid, -r_wid), (size, s_wid))
-                msg = self.fmtColumns(columns, u" ", u"\n")
-                hibeg, hiend = self._highlight(self.conf.color_update_installed)
+                out.append(self.fmtColumns(columns, u" ", u"\n"))
                 for obspo in sorted(obsoletes):
-                    appended = '     ' + _('replacing') + '  %s%s%s.%s %s\n'
-                    appended %= (hibeg, obspo.name, hiend, obspo.arch, obspo.evr)
-                    msg += appended
-                totalmsg = totalmsg + msg
-
-            if lines:
-                out.append(totalmsg)
+                    out.append(replacing_fmt % (hibeg, obspo.name, hiend, obspo.arch, obspo.evr))
         out.append(_("""
 Transaction Summary
 %s
@@ -50,6 +50,18 @@ OPTIONAL    = libdnf.transaction.CompsPackageType_OPTIONAL
 
 ALL_TYPES = CONDITIONAL | DEFAULT | MANDATORY | OPTIONAL
 
+# libcomps leaves empty entries and arch attributes out of the written XML by
+# default, keep them so that the XML reads back as the comps it was written from
+_XML_OPTIONS = {
+    'empty_groups': True,
+    'empty_categories': True,
+    'empty_environments': True,
+    'empty_packages': True,
+    'empty_grouplist': True,
+    'empty_optionlist': True,
+    'arch_output': True,
+}
+
 
 def _internal_comps_length(comps):
     collections = (comps.categories, comps.groups, comps.environments)
@@ -345,9 +357,16 @@ class Package(Forwarder):
 class Comps(object):
     # :api
 
+    _BUILDERS = {
+        'categories': '_build_category',
+        'environments': '_build_environment',
+        'groups': '_build_group',
+    }
+
     def __init__(self):
         self._i = libcomps.Comps()
         self._langs = _Langs()
+        self._reset_caches()
 
     def __len__(self):
         return _internal_comps_length(self._i)
@@ -364,6 +383,14 @@ class Comps(object):
     def _build_package(self, ipkg):
         return Package(ipkg)
 
+    def _reset_caches(self):
+        """Drop the wrappers and indexes built over the underlying comps."""
+        self._wrappers = {}
+        self._ids = {}
+        self._sorted = {}
+        self._name_indexes = {}
+        self._package_group_ids = None
+
     def _add_from_xml_filename(self, fn):
         comps = libcomps.Comps()
         try:
@@ -372,6 +399,71 @@ class Comps(object):
             errors = comps.get_last_errors()
             raise CompsError(' '.join(errors))
         self._i += comps
+        self._reset_caches()
+
+    def _write_xml_filename(self, fn):
+        self._i.toxml_f(fn, xml_options=_XML_OPTIONS)
+
+    def _arch_filter(self, arches):
+        self._i.arch_filter(arches)
+        self._reset_caches()
+
+    def _items(self, kind):
+        """Return the wrappers of the given kind, building them only once."""
+        items = self._wrappers.get(kind)
+        if items is None:
+            build = getattr(self, self._BUILDERS[kind])
+            items = [build(i) for i in getattr(self._i, kind)]
+            self._wrappers[kind] = items
+        return items
+
+    def _item_by_id(self, kind, id_):
+        ids = self._ids.get(kind)
+        if ids is None:
+            ids = {}
+            for item in self._items(kind):
+                ids.setdefault(item.id, item)
+            self._ids[kind] = ids
+        return ids.get(id_)
+
+    def _sorted_items(self, kind):
+        items = self._sorted.get(kind)
+        if items is None:
+            items = sorted(self._items(kind), key=_fn_display_order)
+            self._sorted[kind] = items
+        return items
+
+    def _name_index(self, kind, case_sensitive):
+        """Return a dict mapping ids, names and translated names to items.
+
+        Translated names depend on the current languages, which are part of
+        the cache key.
+        """
+        key = (kind, case_sensitive, tuple(self._langs.get()))
+        index = self._name_indexes.get(key)
+        if index is None:
+            index = {}
+            for item in self._items(kind):
+                for name in (item.id, item.name, item.ui_name):
+                    if name is None:
+                        continue
+                    if not case_sensitive:
+                        name = name.lower()
+                    index.setdefault(name, set()).add(item)
+            self._name_indexes[key] = index
+        return index
+
+    def _items_by_pattern(self, kind, pattern, case_sensitive):
+        pattern = dnf.i18n.ucd(pattern)
+        exact = self._name_index(kind, True).get(pattern, ())
+        exact = {item for item in exact if pattern in (item.id, item.name)}
+        if exact:
+            return exact
+        if dnf.util.is_glob_pattern(pattern):
+            return _by_pattern(pattern, case_sensitive, self._items(kind))
+        if not case_sensitive:
+            pattern = pattern.lower()
+        return set(self._name_index(kind, case_sensitive).get(pattern, ()))
 
     @property
     def categories(self):
@@ -387,20 +479,20 @@ class Comps(object):
     def categories_by_pattern(self, pattern, case_sensitive=False):
         # :api
         assert dnf.util.is_string_type(pattern)
-        return _by_pattern(pattern, case_sensitive, self.categories)
+        return self._items_by_pattern('categories', pattern, case_sensitive)
 
     def categories_iter(self):
         # :api
-        return (self._build_category(c) for c in self._i.categories)
+        return iter(self._items('categories'))
 
     @property
     def environments(self):
         # :api
-        return sorted(self.environments_iter(), key=_fn_display_order)
+        return list(self._sorted_items('environments'))
 
     def _environment_by_id(self, id):
         assert dnf.util.is_string_type(id)
-        return dnf.util.first(g for g in self.environments_iter() if g.id == id)
+        return self._item_by_id('environments', id)
 
     def environment_by_pattern(self, pattern, case_sensitive=False):
         # :api
@@ -411,22 +503,22 @@ class Comps(object):
     def environments_by_pattern(self, pattern, case_sensitive=False):
         # :api
         assert dnf.util.is_string_type(pattern)
-        envs = list(self.environments_iter())
-        found_envs = _by_pattern(pattern, case_sensitive, envs)
+        found_envs = self._items_by_pattern('environments', pattern,
+                                            case_sensitive)
         return sorted(found_envs, key=_fn_display_order)
 
     def environments_iter(self):
         # :api
-        return (self._build_environment(e) for e in self._i.environments)
+        return iter(self._items('environments'))
 
     @property
     def groups(self):
         # :api
-        return sorted(self.groups_iter(), key=_fn_display_order)
+        return list(self._sorted_items('groups'))
 
     def _group_by_id(self, id_):
         assert dnf.util.is_string_type(id_)
-        return dnf.util.first(g for g in self.groups_iter() if g.id == id_)
+        return self._item_by_id('groups', id_)
 
     def group_by_pattern(self, pattern, case_sensitive=False):
         # :api
@@ -437,12 +529,22 @@ class Comps(object):
     def groups_by_pattern(self, pattern, case_sensitive=False):
         # :api
         assert dnf.util.is_string_type(pattern)
-        grps = _by_pattern(pattern, case_sensitive, list(self.groups_iter()))
+        grps = self._items_by_pattern('groups', pattern, case_sensitive)
         return sorted(grps, key=_fn_display_order)
 
     def groups_iter(self):
         # :api
-        return (self._build_group(g) for g in self._i.groups)
+        return iter(self._items('groups'))
+
+    def _group_ids_by_package_name(self):
+        """Return a dict mapping package names to ids of groups listing them."""
+        if self._package_group_ids is None:
+            index = {}
+            for group in self._i.groups:
+                for pkg in group.packages:
+                    index.setdefault(pkg.name, set()).add(group.id)
+            self._package_group_ids = index
+        return self._package_group_ids
 
 class CompsTransPkg(object):
     def __init__(self, pkg_or_name):
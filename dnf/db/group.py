@@ -18,6 +18,8 @@
 #
 
 
+import contextlib
+
 import libdnf.transaction
 
 import dnf.db.history
@@ -36,6 +38,7 @@ class PersistorBase(object):
         self._removed = {}
         self._upgraded = {}
         self._downgraded = {}
+        self._swdb_owners = None
 
     def __len__(self):
         return len(self._installed) + len(self._removed) + len(self._upgraded) + len(self._downgraded)
@@ -45,28 +48,65 @@ class PersistorBase(object):
         self._removed = {}
         self._upgraded = {}
         self._downgraded = {}
+        self._swdb_owners = None
 
     def _get_obj_id(self, obj):
         raise NotImplementedError
 
+    def _get_installed_member_ids(self, obj):
+        raise NotImplementedError
+
+    def _get_installed_objs(self):
+        raise NotImplementedError
+
+    def _owners(self, member_id):
+        """Return ids of the installed objects listing member_id as installed.
+
+        The objects installed according to swdb are loaded in one pass and
+        indexed by their installed members until the next change in the
+        transaction. Objects installed or removed in the current transaction
+        are applied on top of that as they are at the time of the call, they
+        can still get members after being installed.
+        """
+        if self._swdb_owners is None:
+            index = {}
+            for obj in self._get_installed_objs():
+                obj_id = self._get_obj_id(obj)
+                for obj_member_id in self._get_installed_member_ids(obj):
+                    index.setdefault(obj_member_id, set()).add(obj_id)
+            self._swdb_owners = index
+
+        owners = set(self._swdb_owners.get(member_id, ()))
+        for obj_id, obj in self._removed.items():
+            if member_id in self._get_installed_member_ids(obj):
+                owners.discard(obj_id)
+        for obj_id, obj in self._installed.items():
+            if member_id in self._get_installed_member_ids(obj):
+                owners.add(obj_id)
+        return owners
+
     def _add_to_history(self, item, action):
         ti = self.history.swdb.addItem(item, "", action, libdnf.transaction.TransactionItemReason_USER)
         ti.setState(libdnf.transaction.TransactionItemState_DONE)
 
     def install(self, obj):
         self._installed[self._get_obj_id(obj)] = obj
+        self._swdb_owners = None
         self._add_to_history(obj, libdnf.transaction.TransactionItemAction_INSTALL)
 
     def remove(self, obj):
         self._removed[self._get_obj_id(obj)] = obj
+        self._swdb_owners = None
         self._add_to_history(obj, libdnf.transaction.TransactionItemAction_REMOVE)
 
     def upgrade(self, obj):
         self._upgraded[self._get_obj_id(obj)] = obj
+        self._swdb_owners = None
         self._add_to_history(obj, libdnf.transaction.TransactionItemAction_UPGRADE)
 
     def downgrade(self, obj):
         self._downgraded[self._get_obj_id(obj)] = obj
+        self._swdb_owners = None
         self._add_to_history(obj, libdnf.transaction.TransactionItemAction_DOWNGRADE)
 
     def new(self, obj_id, name, translated_name, pkg_types):
@@ -89,6 +129,9 @@ class GroupPersistor(PersistorBase):
     def _get_obj_id(self, obj):
         return obj.getGroupId()
 
+    def _get_installed_member_ids(self, obj):
+        return [pkg.getName() for pkg in obj.getPackages() if pkg.getInstalled()]
+
     def new(self, obj_id, name, translated_name, pkg_types):
         swdb_group = self.history.swdb.createCompsGroupItem()
         swdb_group.setGroupId(obj_id)
@@ -112,31 +155,20 @@ class GroupPersistor(PersistorBase):
     def get_package_groups(self, pkg_name):
         return self.history.swdb.getPackageCompsGroups(pkg_name)
 
+    def _get_installed_objs(self):
+        # swdb returns only the groups whose last transaction item installed them
+        return [item.getCompsGroupItem() for item in self.search_by_pattern('%')]
+
     def is_removable_pkg(self, pkg_name):
         # for group removal and autoremove
-        reason = self.history.swdb.resolveRPMTransactionItemReason(pkg_name, "", -2)
-        if reason != libdnf.transaction.TransactionItemReason_GROUP:
+        # a member of an installed group is never removable, that is known
+        # without asking swdb once the installed groups are loaded
+        if self._owners(pkg_name):
             return False
 
         # TODO: implement lastTransId == -2 in libdnf
-        package_groups = set(self.get_package_groups(pkg_name))
-        for group_id, group in self._removed.items():
-            for pkg in group.getPackages():
-                if pkg.getName() != pkg_name:
-                    continue
-                if not pkg.getInstalled():
-                    continue
-                package_groups.remove(group_id)
-        for group_id, group in self._installed.items():
-            for pkg in group.getPackages():
-                if pkg.getName() != pkg_name:
-                    continue
-                if not pkg.getInstalled():
-                    continue
-                package_groups.add(group_id)
-        if package_groups:
-            return False
-        return True
+        reason = self.history.swdb.resolveRPMTransactionItemReason(pkg_name, "", -2)
+        return reason == libdnf.transaction.TransactionItemReason_GROUP
 
 
 class EnvironmentPersistor(PersistorBase):
@@ -149,6 +181,9 @@ class EnvironmentPersistor(PersistorBase):
     def _get_obj_id(self, obj):
         return obj.getEnvironmentId()
 
+    def _get_installed_member_ids(self, obj):
+        return [group.getGroupId() for group in obj.getGroups() if group.getInstalled()]
+
     def new(self, obj_id, name, translated_name, pkg_types):
         swdb_env = self.history.swdb.createCompsEnvironmentItem()
         swdb_env.setEnvironmentId(obj_id)
@@ -172,6 +207,10 @@ class EnvironmentPersistor(PersistorBase):
     def get_group_environments(self, group_id):
         return self.history.swdb.getCompsGroupEnvironments(group_id)
 
+    def _get_installed_objs(self):
+        # swdb returns only the environments whose last transaction item installed them
+        return [item.getCompsEnvironmentItem() for item in self.search_by_pattern('%')]
+
     def is_removable_group(self, group_id):
         # for environment removal
         swdb_group = self.history.group.get(group_id)
@@ -179,24 +218,7 @@ class EnvironmentPersistor(PersistorBase):
             return False
 
         # TODO: implement lastTransId == -2 in libdnf
-        group_environments = set(self.get_group_environments(group_id))
-        for env_id, env in self._removed.items():
-            for group in env.getGroups():
-                if group.getGroupId() != group_id:
-                    continue
-                if not group.getInstalled():
-                    continue
-                group_environments.remove(env_id)
-        for env_id, env in self._installed.items():
-            for group in env.getGroups():
-                if group.getGroupId() != group_id:
-                    continue
-                if not group.getInstalled():
-                    continue
-                group_environments.add(env_id)
-        if group_environments:
-            return False
-        return True
+        return not self._owners(group_id)
 
 
 class RPMTransaction(object):
@@ -209,6 +231,7 @@ class RPMTransaction(object):
             except:
                 pass
         self._swdb_ti_pkg = {}
+        self._reasons = None
 
     # TODO: close trans if needed
 
@@ -257,7 +280,27 @@ class RPMTransaction(object):
 
     def get_reason(self, pkg):
         """Get reason for package"""
-        return self.history.swdb.resolveRPMTransactionItemReason(pkg.name, pkg.arch, -1)
+        if self._reasons is None:
+            return self.history.swdb.resolveRPMTransactionItemReason(pkg.name, pkg.arch, -1)
+        key = (pkg.name, pkg.arch)
+        reason = self._reasons.get(key)
+        if reason is None:
+            reason = self.history.swdb.resolveRPMTransactionItemReason(pkg.name, pkg.arch, -1)
+            self._reasons[key] = reason
+        return reason
+
+    @contextlib.contextmanager
+    def _cached_reasons(self):
+        """Resolve the reason of each name and arch from the history db only once.
+
+        The db is not written to while items are being added to the transaction,
+        so the resolved reasons stay valid until the context is left.
+        """
+        self._reasons = {}
+        try:
+            yield
+        finally:
+            self._reasons = None
 
     def get_reason_name(self, pkg):
         """Get reason for package"""
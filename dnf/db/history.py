@@ -363,13 +363,20 @@ class SwdbInterface(object):
 
     # TODO: rename to: list_transactions?
     def old(self, tids=None, limit=0, complete_transactions_only=False):
-        tids = tids or []
-        tids = [int(i) for i in tids]
+        """Return transactions with the given ids, newest first.
+
+        Only the selected transactions are wrapped.
+
+        :param tids: transaction ids, all transactions if empty
+        :param limit: return at most this many of the newest matches
+        """
+        tids = set(int(i) for i in tids or [])
         result = self.swdb.listTransactions()
-        result = [TransactionWrapper(i) for i in result]
-        # TODO: move to libdnf
         if tids:
-            result = [i for i in result if i.tid in tids]
+            result = [trans for trans in result if trans.getId() in tids]
+        if limit:
+            result = result[-limit:]
+        result = [TransactionWrapper(i) for i in result]
 
         # populate altered_lt_rpmdb and altered_gt_rpmdb
         for i, trans in enumerate(result):
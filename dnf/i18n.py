@@ -153,6 +153,23 @@ def _exact_width_char(uchar):
     return 2 if unicodedata.east_asian_width(uchar) in ('W', 'F') else 1
 
 
+def _is_ascii(msg):
+    try:
+        return msg.isascii()
+    except AttributeError:
+        # str.isascii() is new in Python 3.7
+        try:
+            msg.encode('ascii')
+        except UnicodeError:
+            return False
+        return True
+
+
+# widths of the non-ASCII strings, they are computed character by character
+_exact_width_cache = {}
+_EXACT_WIDTH_CACHE_SIZE = 4096
+
+
 def chop_str(msg, chop=None):
     """ Return the textual width of a Unicode string, chopping it to
         a specified value. This is what you want to use instead of %.*s, as it
@@ -162,6 +179,11 @@ def chop_str(msg, chop=None):
     if chop is None:
         return exact_width(msg), msg
 
+    if _is_ascii(msg):
+        # every ASCII character is one column wide
+        msg = msg[:max(chop, 0)]
+        return len(msg), msg
+
     width = 0
     chopped_msg = ""
     for char in msg:
@@ -176,7 +198,15 @@ def chop_str(msg, chop=None):
 def exact_width(msg):
     """ Calculates width of char at terminal screen
         (Asian char counts for two) """
-    return sum(_exact_width_char(c) for c in msg)
+    if _is_ascii(msg):
+        return len(msg)
+    width = _exact_width_cache.get(msg)
+    if width is None:
+        width = sum(_exact_width_char(c) for c in msg)
+        if len(_exact_width_cache) >= _EXACT_WIDTH_CACHE_SIZE:
+            _exact_width_cache.clear()
+        _exact_width_cache[msg] = width
+    return width
 
 
 def fill_exact_width(msg, fill, chop=None, left=True, prefix='', suffix=''):
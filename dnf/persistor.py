@@ -26,13 +26,20 @@
 from __future__ import absolute_import
 from __future__ import unicode_literals
 from dnf.i18n import _
+import calendar
+import collections
+import datetime
 import dnf.util
 import errno
 import fnmatch
+import glob
+import hashlib
+import hawkey
 import json
 import logging
 import os
 import re
+import tempfile
 
 logger = logging.getLogger("dnf")
 
@@ -64,6 +71,62 @@ class JSONDB(object):
         with open(json_path, 'w') as f:
             json.dump(content, f)
 
+    def _load_json_db(self, json_path, what):
+        """Return the dict stored in json_path, None if there is none."""
+        if not os.path.isfile(json_path):
+            return None
+        try:
+            content = self._get_json_db(json_path, default={})
+        except (IOError, OSError) as e:
+            logger.warning(_("Failed to load %s: %s"), what, e)
+            return None
+        return content if isinstance(content, dict) else None
+
+    def _get_keyed_json_db(self, json_path, key, what):
+        """Return the dict stored in json_path if it was saved with key."""
+        content = self._load_json_db(json_path, what)
+        if content is None or content.get('key') != key:
+            return None
+        return content
+
+    @staticmethod
+    def _replace_file(path, write):
+        """Write path by calling write(tmp_path) and moving tmp_path in place.
+
+        Readers see either the previous or the complete new file.
+
+        """
+        fd, tmp_path = tempfile.mkstemp(prefix=os.path.basename(path) + '.',
+                                        dir=os.path.dirname(path))
+        os.close(fd)
+        try:
+            os.chmod(tmp_path, 0o644)
+            write(tmp_path)
+            os.replace(tmp_path, path)
+        except BaseException:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            raise
+
+    def _store_json_db(self, json_path, content, what, write_data=None):
+        """Store content to json_path, return False if it can't be written.
+
+        write_data is called first to store any data the content describes.
+
+        """
+        try:
+            dnf.util.ensure_dir(os.path.dirname(json_path))
+            if write_data is not None:
+                write_data()
+            self._replace_file(json_path, lambda path: self._write_json_db(path, content))
+        except (IOError, OSError) as e:
+            # the cachedir is not writable e.g. for users running -C
+            logger.debug(_("Failed to store %s: %s"), what, e)
+            return False
+        return True
+
 
 class RepoPersistor(JSONDB):
     """Persistent data kept for repositories.
@@ -113,6 +176,133 @@ class RepoPersistor(JSONDB):
             return None
 
 
+_CachedPackage = collections.namedtuple('_CachedPackage', ['name', 'evr', 'arch', 'filename'])
+_CachedReference = collections.namedtuple('_CachedReference', ['type', 'id', 'title'])
+
+
+class _CachedAdvisory(object):
+    """Advisory data kept in the applicable advisories cache."""
+
+    def __init__(self, id, type, severity, updated, references):
+        self.id = id
+        self.type = type
+        self.severity = severity
+        self.updated = updated
+        self.references = references
+
+    def _match_reference(self, ref_type, ref_id):
+        return any(ref.type == ref_type and ref.id == ref_id for ref in self.references)
+
+    def match_bug(self, bug):
+        return self._match_reference(hawkey.REFERENCE_BUGZILLA, bug)
+
+    def match_cve(self, cve):
+        return self._match_reference(hawkey.REFERENCE_CVE, cve)
+
+
+class AdvisoryPersistor(JSONDB):
+    """Advisories applicable to the installed packages, stored to cachedir.
+
+    The (advisory package, advisory, installed) triplets are only valid for
+    the key they were saved with.
+
+    """
+
+    def __init__(self, cachedir):
+        self.db_path = os.path.join(cachedir, "applicable_advisories.json")
+
+    def exists(self):
+        return os.path.isfile(self.db_path)
+
+    @staticmethod
+    def _dump(apkg_adv_insts):
+        advisories = {}
+        packages = []
+        for apkg, advisory, installed in apkg_adv_insts:
+            if advisory.id not in advisories:
+                advisories[advisory.id] = [
+                    advisory.type, advisory.severity,
+                    calendar.timegm(advisory.updated.timetuple()),
+                    [[ref.type, ref.id, ref.title] for ref in advisory.references]]
+            packages.append([apkg.name, apkg.evr, apkg.arch, apkg.filename, advisory.id, installed])
+        return {'advisories': advisories, 'packages': packages}
+
+    @staticmethod
+    def _load(table):
+        advisories = {}
+        for aid, (atype, severity, updated, references) in table['advisories'].items():
+            # keep it naive, like the updated time of hawkey advisories
+            updated = datetime.datetime.fromtimestamp(updated, datetime.timezone.utc)
+            advisories[aid] = _CachedAdvisory(
+                aid, atype, severity, updated.replace(tzinfo=None),
+                [_CachedReference(*ref) for ref in references])
+        return [(_CachedPackage(name, evr, arch, filename), advisories[aid], installed)
+                for name, evr, arch, filename, aid, installed in table['packages']]
+
+    def get(self, key):
+        content = self._get_keyed_json_db(self.db_path, key,
+                                          _("applicable advisories cache"))
+        return self._load(content['table']) if content is not None else None
+
+    def save(self, key, apkg_adv_insts):
+        return self._store_json_db(self.db_path,
+                                   {'key': key, 'table': self._dump(apkg_adv_insts)},
+                                   _("applicable advisories cache"))
+
+
+class CompsPersistor(JSONDB):
+    """Merged comps of the enabled repositories, stored to cachedir.
+
+    The XML snapshot is named after the key it was saved with and is never
+    rewritten in place, so the key read from the JSON file always matches the
+    snapshot it points to.
+
+    """
+
+    def __init__(self, cachedir):
+        self.cachedir = cachedir
+        self.db_path = os.path.join(cachedir, "comps_cache.json")
+
+    def _xml_path(self, key):
+        digest = hashlib.sha256(json.dumps(key, sort_keys=True).encode('utf-8')).hexdigest()
+        return os.path.join(self.cachedir, "comps_cache-%s.xml" % digest[:16])
+
+    def get(self, key):
+        """Return the path of the snapshot saved with key or None."""
+        content = self._get_keyed_json_db(self.db_path, key, _("comps cache"))
+        if content is None:
+            return None
+        xml_path = self._xml_path(key)
+        return xml_path if os.path.isfile(xml_path) else None
+
+    def save(self, key, comps):
+        xml_path = self._xml_path(key)
+        if not self._store_json_db(
+                self.db_path, {'key': key}, _("comps cache"),
+                write_data=lambda: self._replace_file(xml_path, comps._write_xml_filename)):
+            return False
+        for path in glob.glob(os.path.join(self.cachedir, "comps_cache*.xml")):
+            if path != xml_path:
+                try:
+                    os.unlink(path)
+                except OSError:
+                    pass
+        return True
+
+
+class CheckPersistor(JSONDB):
+    """Result of the last incremental `check` command, stored to cachedir."""
+
+    def __init__(self, cachedir):
+        self.db_path = os.path.join(cachedir, "check.json")
+
+    def get_last_check(self):
+        return self._load_json_db(self.db_path, _("last check results")) or None
+
+    def save(self, state):
+        return self._store_json_db(self.db_path, state, _("check results"))
+
+
 class TempfilePersistor(JSONDB):
 
     def __init__(self, cachedir):
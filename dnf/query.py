@@ -20,12 +20,14 @@
 
 from __future__ import absolute_import
 from __future__ import unicode_literals
+import collections
 import hawkey
 
 from hawkey import Query
 from dnf.i18n import ucd
 from dnf.pycomp import basestring
 
+_DEPENDENCY_TYPES = ('requires', 'recommends', 'suggests', 'supplements', 'enhances')
 
 
 def _by_provides(sack, patterns, ignore_case=False, get_query=False):
@@ -47,3 +49,111 @@ def _per_nevra_dict(pkg_list):
     for pkg in pkg_list:
         nevra_dic.setdefault(ucd(pkg), []).append(pkg)
     return nevra_dic
+
+def requires_closure(query, packages):
+    """Return `packages` and all packages of `query` transitively requiring them."""
+    done = packages
+    frontier = packages
+    while frontier:
+        frontier = query.filter(requires=frontier).difference(done)
+        done = done.union(frontier)
+    return done
+
+def providers_closure(query, packages):
+    """Return `packages` and all packages of `query` transitively providing their requires."""
+    done = packages
+    frontier = packages
+    resolved = set()
+    while frontier:
+        reldeps = []
+        for pkg in frontier.run():
+            for reldep in pkg.requires:
+                key = str(reldep)
+                if key not in resolved:
+                    resolved.add(key)
+                    reldeps.append(reldep)
+        if not reldeps:
+            break
+        frontier = query.filter(provides=reldeps).difference(done)
+        done = done.union(frontier)
+    return done
+
+def _filter_by_deps(query, patterns, dep_types=_DEPENDENCY_TYPES, providers=None):
+    """Return packages from `query` having any of `dep_types` matching `patterns`.
+
+    When the `providers` query is given, packages depending on anything
+    those packages provide are matched as well.
+    """
+    depquery = query.filter(empty=True)
+    for dep_type in dep_types:
+        if patterns:
+            depquery = depquery.union(query.filter(**{dep_type + '__glob': patterns}))
+        if providers:
+            depquery = depquery.union(query.filter(**{dep_type: providers}))
+    return depquery
+
+def _installed_evrs(sack):
+    """Return the highest installed EVR of every installed package name."""
+    evrs = {}
+    for pkg in sack.query().installed():
+        evr = evrs.get(pkg.name)
+        if evr is None or sack.evr_cmp(pkg.evr, evr) > 0:
+            evrs[pkg.name] = pkg.evr
+    return evrs
+
+def _newer_equal_installed(sack, installed_evrs, apackage):
+    evr = installed_evrs.get(apackage.name)
+    return evr is not None and sack.evr_cmp(evr, apackage.evr) >= 0
+
+def _running_kernel_pkgs(sack):
+    """Return query containing packages of currently running kernel"""
+    q = sack.query().filterm(empty=True)
+    kernel = sack.get_running_kernel()
+    if kernel:
+        q = q.union(sack.query().filterm(sourcerpm=kernel.sourcerpm))
+    return q
+
+def _apkg_advisories(sack, apackages):
+    """Return (adv. package, advisory) pairs, resolving every advisory once.
+
+    hawkey does not tell which advisory an advisory package comes from
+    without resolving it, so the advisory of the first package not paired
+    yet is resolved and it is paired with the other packages it lists,
+    matched by name, EVR, arch and file name.
+    """
+    def key(apackage):
+        return (apackage.name, apackage.evr, apackage.arch, apackage.filename)
+
+    apackages = list(apackages)
+    unpaired = {}
+    for index, apackage in enumerate(apackages):
+        unpaired.setdefault(key(apackage), collections.deque()).append(index)
+    advisories = [None] * len(apackages)
+    for index, apackage in enumerate(apackages):
+        if advisories[index] is not None:
+            continue
+        advisory = apackage.get_advisory(sack)
+        own_key = key(apackage)
+        unpaired[own_key].remove(index)
+        advisories[index] = advisory
+        skip_own = True
+        for pkg in advisory.packages:
+            pkg_key = key(pkg)
+            if skip_own and pkg_key == own_key:
+                # this entry of the advisory is the package just resolved
+                skip_own = False
+                continue
+            indexes = unpaired.get(pkg_key)
+            if indexes:
+                advisories[indexes.popleft()] = advisory
+    return zip(apackages, advisories)
+
+def _available_apkg_adv_insts(sack):
+    """Return all available (adv. package, adv., inst.) triplets"""
+    # check advisories for the latest installed packages
+    q = sack.query().installed().latest(1)
+    # plus packages of the running kernel
+    q = q.union(_running_kernel_pkgs(sack).installed())
+    installed_evrs = _installed_evrs(sack)
+    return [(apackage, advisory, _newer_equal_installed(sack, installed_evrs, apackage))
+            for apackage, advisory in _apkg_advisories(sack, q.get_advisory_pkgs(hawkey.GT))]
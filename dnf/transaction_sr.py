@@ -23,7 +23,9 @@ import hawkey
 
 from dnf.i18n import _
 import dnf.exceptions
+import dnf.transaction
 
+import gzip
 import json
 
 
@@ -105,6 +107,68 @@ def _check_version(version, filename):
         )
 
 
+def _serialize_rpm(tsi, action=None):
+    return {
+        "action": action or tsi.action_name,
+        "nevra": tsi.nevra,
+        "reason": libdnf.transaction.TransactionItemReasonToString(tsi.reason),
+        "repo_id": tsi.from_repo
+    }
+
+
+def _serialize_group(tsi, action=None):
+    group = tsi.get_group()
+
+    group_data = {
+        "action": action or tsi.action_name,
+        "id": group.getGroupId(),
+        "packages": [],
+        "package_types": libdnf.transaction.compsPackageTypeToString(group.getPackageTypes())
+    }
+
+    for pkg in group.getPackages():
+        group_data["packages"].append({
+            "name": pkg.getName(),
+            "installed": pkg.getInstalled(),
+            "package_type": libdnf.transaction.compsPackageTypeToString(pkg.getPackageType())
+        })
+
+    return group_data
+
+
+def _serialize_environment(tsi, action=None):
+    env = tsi.get_environment()
+
+    env_data = {
+        "action": action or tsi.action_name,
+        "id": env.getEnvironmentId(),
+        "groups": [],
+        "package_types": libdnf.transaction.compsPackageTypeToString(env.getPackageTypes())
+    }
+
+    for grp in env.getGroups():
+        env_data["groups"].append({
+            "id": grp.getGroupId(),
+            "installed": grp.getInstalled(),
+            "group_type": libdnf.transaction.compsPackageTypeToString(grp.getGroupType())
+        })
+
+    return env_data
+
+
+def _store_items(data, rpms, groups, environments):
+    if rpms:
+        data["rpms"] = rpms
+
+    if groups:
+        data["groups"] = groups
+
+    if environments:
+        data["environments"] = environments
+
+    return data
+
+
 def serialize_transaction(transaction):
     """
     Serializes a transaction to a data structure that is equivalent to the stored JSON format.
@@ -123,61 +187,210 @@ def serialize_transaction(transaction):
 
     for tsi in transaction.packages():
         if tsi.is_package():
-            rpms.append({
-                "action": tsi.action_name,
-                "nevra": tsi.nevra,
-                "reason": libdnf.transaction.TransactionItemReasonToString(tsi.reason),
-                "repo_id": tsi.from_repo
-            })
+            rpms.append(_serialize_rpm(tsi))
 
         elif tsi.is_group():
-            group = tsi.get_group()
-
-            group_data = {
-                "action": tsi.action_name,
-                "id": group.getGroupId(),
-                "packages": [],
-                "package_types": libdnf.transaction.compsPackageTypeToString(group.getPackageTypes())
-            }
-
-            for pkg in group.getPackages():
-                group_data["packages"].append({
-                    "name": pkg.getName(),
-                    "installed": pkg.getInstalled(),
-                    "package_type": libdnf.transaction.compsPackageTypeToString(pkg.getPackageType())
-                })
-
-            groups.append(group_data)
+            groups.append(_serialize_group(tsi))
 
         elif tsi.is_environment():
-            env = tsi.get_environment()
-
-            env_data = {
-                "action": tsi.action_name,
-                "id": env.getEnvironmentId(),
-                "groups": [],
-                "package_types": libdnf.transaction.compsPackageTypeToString(env.getPackageTypes())
-            }
-
-            for grp in env.getGroups():
-                env_data["groups"].append({
-                    "id": grp.getGroupId(),
-                    "installed": grp.getInstalled(),
-                    "group_type": libdnf.transaction.compsPackageTypeToString(grp.getGroupType())
-                })
+            environments.append(_serialize_environment(tsi))
 
-            environments.append(env_data)
+    return _store_items(data, rpms, groups, environments)
 
-    if rpms:
-        data["rpms"] = rpms
 
-    if groups:
-        data["groups"] = groups
+def serialize_transaction_range(transactions, evr_cmp):
+    """
+    Serializes the net effect of consecutive transactions, as if they were a
+    single transaction, to a data structure that is equivalent to the stored
+    JSON format.
+
+    Every package NEVRA is recorded at most once: either as removed, when it
+    was installed before the first transaction and is not after the last
+    one, or as installed in the opposite case. A single removed and
+    installed NEVRA of the same name and arch make an upgrade or downgrade.
+    Groups and environments are compared the same way by whether they were
+    installed before the first transaction and after the last one: they are
+    recorded as installed, removed or upgraded, or left out if the state did
+    not change.
+    :param transactions: the transactions (instances of dnf.db.history.TransactionWrapper)
+    :param evr_cmp: a function comparing two EVR strings, like dnf.sack.Sack.evr_cmp
+    """
 
-    if environments:
-        data["environments"] = environments
+    removed = {}
+    installed = {}
+    reason_changes = {}
+    comps_first = {}
+    comps_last = {}
+
+    for transaction in sorted(transactions, key=lambda t: t.tid):
+        tsis = transaction.packages()
+        # within a transaction the old versions go away before the new ones come
+        for tsi in tsis:
+            if tsi.is_package():
+                if tsi.action in dnf.transaction.BACKWARD_ACTIONS or \
+                        tsi.action == libdnf.transaction.TransactionItemAction_REINSTALLED:
+                    if installed.pop(tsi.nevra, None) is None:
+                        removed[tsi.nevra] = tsi
+            elif tsi.is_group() or tsi.is_environment():
+                if tsi.is_group():
+                    key = ("group", tsi.get_group().getGroupId())
+                else:
+                    key = ("environment", tsi.get_environment().getEnvironmentId())
+                comps_first.setdefault(key, tsi)
+                comps_last[key] = tsi
+        for tsi in tsis:
+            if not tsi.is_package():
+                continue
+            if tsi.action in dnf.transaction.FORWARD_ACTIONS:
+                if removed.pop(tsi.nevra, None) is None:
+                    installed[tsi.nevra] = tsi
+            elif tsi.action == libdnf.transaction.TransactionItemAction_REASON_CHANGE:
+                reason_changes[tsi.nevra] = tsi
 
-    return data
+    by_na = {}
+    for changes, index in ((removed, 0), (installed, 1)):
+        for tsi in changes.values():
+            by_na.setdefault((tsi.name, tsi.arch), ([], []))[index].append(tsi)
+
+    rpms = []
+    for (old, new) in by_na.values():
+        if len(old) == 1 and len(new) == 1:
+            if evr_cmp(new[0].evr, old[0].evr) > 0:
+                rpms.append(_serialize_rpm(new[0], "Upgrade"))
+                rpms.append(_serialize_rpm(old[0], "Upgraded"))
+            else:
+                rpms.append(_serialize_rpm(new[0], "Downgrade"))
+                rpms.append(_serialize_rpm(old[0], "Downgraded"))
+            continue
+        rpms.extend(_serialize_rpm(tsi, "Removed") for tsi in old)
+        rpms.extend(_serialize_rpm(tsi, "Install") for tsi in new)
+    for nevra, tsi in reason_changes.items():
+        if nevra not in removed and nevra not in installed:
+            rpms.append(_serialize_rpm(tsi))
+    rpms.sort(key=lambda rpm: rpm["nevra"])
+
+    groups = []
+    environments = []
+    for key in sorted(comps_last):
+        first, last = comps_first[key], comps_last[key]
+        before = first.action != libdnf.transaction.TransactionItemAction_INSTALL
+        after = last.action != libdnf.transaction.TransactionItemAction_REMOVE
+        if before and after:
+            # removed and installed again ends up the same as an upgrade
+            tsi = last
+            action = None if last.action in (libdnf.transaction.TransactionItemAction_UPGRADE,
+                                             libdnf.transaction.TransactionItemAction_DOWNGRADE) \
+                else "Upgrade"
+        elif after:
+            tsi, action = last, "Install"
+        elif before:
+            tsi, action = first, "Removed"
+        else:
+            continue
+        if key[0] == "group":
+            groups.append(_serialize_group(tsi, action))
+        else:
+            environments.append(_serialize_environment(tsi, action))
+
+    data = {
+        "version": VERSION,
+    }
+    return _store_items(data, rpms, groups, environments)
+
+
+_GZIP_MAGIC = b"\x1f\x8b"
+
+
+def _split_nevra(nevra):
+    try:
+        name_evr, arch = nevra.rsplit(".", 1)
+        name, version, release = name_evr.rsplit("-", 2)
+    except ValueError:
+        return nevra, None, None
+    return name, "%s-%s" % (version, release), arch
+
+
+def compact_transaction(data):
+    """
+    Converts a serialized transaction to the compact format. The strings of the rpms are
+    stored once in the "strings" table and each rpm is an array of indexes into it:
+    action, name, evr, arch, reason and repo_id. Groups and environments are kept as they are.
+    :param data: the serialized transaction, as returned by serialize_transaction()
+    """
+
+    strings = []
+    indexes = {}
+
+    def intern(string):
+        if string is None:
+            return None
+        index = indexes.get(string)
+        if index is None:
+            index = indexes[string] = len(strings)
+            strings.append(string)
+        return index
+
+    result = dict(data)
+    if "rpms" in data:
+        result["rpms"] = [
+            [intern(rpm["action"])] + [intern(i) for i in _split_nevra(rpm["nevra"])] +
+            [intern(rpm["reason"]), intern(rpm["repo_id"])]
+            for rpm in data["rpms"]
+        ]
+    result["strings"] = strings
+    return result
+
+
+def expand_transaction(data):
+    """
+    Converts a transaction in the compact format back to the data structure of the stored JSON format.
+    :param data: the compact transaction, as returned by compact_transaction()
+    """
+
+    strings = data["strings"]
+
+    def string(index):
+        # negative indexes would silently count from the end of the table
+        if index < 0:
+            raise IndexError(index)
+        return strings[index]
+
+    result = {key: value for key, value in data.items() if key != "strings"}
+    if "rpms" in data:
+        rpms = []
+        try:
+            for action, name, evr, arch, reason, repo_id in data["rpms"]:
+                nevra = string(name)
+                if evr is not None:
+                    nevra = "%s-%s.%s" % (nevra, string(evr), string(arch))
+                rpms.append({
+                    "action": string(action),
+                    "nevra": nevra,
+                    "reason": string(reason),
+                    "repo_id": string(repo_id),
+                })
+        except (IndexError, TypeError, ValueError):
+            raise TransactionError(_('Invalid rpm in the compact transaction.'))
+        result["rpms"] = rpms
+    return result
+
+
+def store_transaction(data, filename, compact=False):
+    """
+    Stores a serialized transaction to a file, either as the stored JSON format or,
+    if `compact` is True, in the compact format compressed by gzip.
+    :param data: the serialized transaction, as returned by serialize_transaction()
+    :param filename: the name of the file to store the transaction to
+    :param compact: whether to use the compact format
+    """
+
+    if compact:
+        with gzip.open(filename, "wt") as f:
+            json.dump(compact_transaction(data), f, separators=(",", ":"))
+    else:
+        with open(filename, "w") as f:
+            json.dump(data, f, indent=4, sort_keys=True)
+            f.write("\n")
 
 
 class TransactionReplay(object):
@@ -218,6 +431,9 @@ class TransactionReplay(object):
 
         self._nevra_cache = set()
         self._nevra_reason_cache = {}
+        self._parsed_nevras = {}
+        self._resolved_names = set()
+        self._na_pkgs = {}
         self._warnings = []
 
         if filename and data:
@@ -230,10 +446,13 @@ class TransactionReplay(object):
 
     def _load_from_file(self, fn):
         self._filename = fn
-        with open(fn, "r") as f:
+        with open(fn, "rb") as f:
+            compressed = f.read(len(_GZIP_MAGIC)) == _GZIP_MAGIC
+        # a compressed file is decompressed while it is being parsed
+        with (gzip.open(fn, "rt") if compressed else open(fn, "r")) as f:
             try:
                 replay_data = json.load(f)
-            except json.decoder.JSONDecodeError as e:
+            except (json.decoder.JSONDecodeError, EOFError, OSError) as e:
                 raise TransactionReplayError(fn, str(e) + ".")
 
         try:
@@ -245,6 +464,11 @@ class TransactionReplay(object):
         self._replay_data = data
         self._verify_toplevel_json(self._replay_data)
 
+        if "strings" in self._replay_data:
+            self._assert_type(self._replay_data["strings"], list, "strings", "array")
+            self._assert_type(self._replay_data.get("rpms", []), list, "rpms", "array")
+            self._replay_data = expand_transaction(self._replay_data)
+
         self._rpms = self._replay_data.get("rpms", [])
         self._assert_type(self._rpms, list, "rpms", "array")
 
@@ -290,19 +514,18 @@ class TransactionReplay(object):
                     .format(reason=pkg_data["reason"], nevra=nevra)
             )
 
-        subj = hawkey.Subject(nevra)
-        parsed_nevras = subj.get_nevra_possibilities(forms=[hawkey.FORM_NEVRA])
-
-        if len(parsed_nevras) != 1:
+        if nevra not in self._parsed_nevras:
+            self._resolve_nevras([pkg_data])
+        parsed_nevra = self._parsed_nevras.get(nevra)
+        if parsed_nevra is None:
             raise TransactionError(_('Cannot parse NEVRA for package "{nevra}".').format(nevra=nevra))
 
-        parsed_nevra = parsed_nevras[0]
         na = "%s.%s" % (parsed_nevra.name, parsed_nevra.arch)
-
-        query_na = self._base.sack.query().filter(name=parsed_nevra.name, arch=parsed_nevra.arch)
+        na_pkgs = self._na_pkgs.get((parsed_nevra.name, parsed_nevra.arch), [])
 
         epoch = parsed_nevra.epoch if parsed_nevra.epoch is not None else 0
-        query = query_na.filter(epoch=epoch, version=parsed_nevra.version, release=parsed_nevra.release)
+        pkgs = [pkg for pkg in na_pkgs if pkg.epoch == epoch and pkg.version == parsed_nevra.version
+                and pkg.release == parsed_nevra.release]
 
         # In case the package is found in the same repo as in the original
         # transaction, limit the query to that plus installed packages. IOW
@@ -313,14 +536,15 @@ class TransactionReplay(object):
         # the same NEVRA is in two repos, this makes sure the same repo is used
         # for both download and upgrade steps of the plugin.
         if repo_id:
-            query_repo = query.filter(reponame=repo_id)
-            if query_repo:
-                query = query_repo.union(query.installed())
+            if any(pkg.reponame == repo_id for pkg in pkgs):
+                pkgs = [pkg for pkg in pkgs if pkg.reponame == repo_id or pkg._from_system]
 
-        if not query:
+        if not pkgs:
             self._raise_or_warn(self._skip_unavailable, _('Cannot find rpm nevra "{nevra}".').format(nevra=nevra))
             return
 
+        query = self._base.sack.query().filterm(pkg=pkgs)
+
         # a cache to check no extra packages were pulled into the transaction
         if action != "Reason Change":
             self._nevra_cache.add(nevra)
@@ -331,7 +555,8 @@ class TransactionReplay(object):
             self._nevra_reason_cache[nevra] = reason
 
         if action in ("Install", "Upgrade", "Downgrade"):
-            if action == "Install" and query_na.installed() and not self._base._get_installonly_query(query_na):
+            if action == "Install" and any(pkg._from_system for pkg in na_pkgs) and \
+                    not self._base._get_installonly_query(self._base.sack.query().filterm(pkg=na_pkgs)):
                 self._raise_or_warn(self._ignore_installed,
                     _('Package "{na}" is already installed for action "{action}".').format(na=na, action=action))
 
@@ -371,6 +596,33 @@ class TransactionReplay(object):
                     .format(action=action, nevra=nevra)
             )
 
+    def _resolve_nevras(self, rpms):
+        """
+        Parses the NEVRAs of the rpms and looks their packages up in the sack with
+        a single query, so that replaying an rpm action does not have to query the sack.
+        """
+
+        names = set()
+        for pkg_data in rpms:
+            nevra = pkg_data.get("nevra") if isinstance(pkg_data, dict) else None
+            if not isinstance(nevra, str) or nevra in self._parsed_nevras:
+                continue
+
+            subj = hawkey.Subject(nevra)
+            parsed_nevras = subj.get_nevra_possibilities(forms=[hawkey.FORM_NEVRA])
+            if len(parsed_nevras) != 1:
+                self._parsed_nevras[nevra] = None
+                continue
+
+            self._parsed_nevras[nevra] = parsed_nevras[0]
+            names.add(parsed_nevras[0].name)
+
+        names -= self._resolved_names
+        if names:
+            self._resolved_names |= names
+            for pkg in self._base.sack.query().filterm(name=list(names)):
+                self._na_pkgs.setdefault((pkg.name, pkg.arch), []).append(pkg)
+
     def _create_swdb_group(self, group_id, pkg_types, pkgs):
         comps_group = self._base.comps._group_by_id(group_id)
         if not comps_group:
@@ -534,6 +786,7 @@ class TransactionReplay(object):
         fn = self._filename
         errors = []
 
+        self._resolve_nevras(self._rpms)
         for pkg_data in self._rpms:
             try:
                 self._replay_pkg_action(pkg_data)
@@ -452,18 +452,21 @@ def _sync_rpm_trans_with_swdb(rpm_transaction, swdb_transaction):
                       libdnf.transaction.TransactionItemAction_UPGRADED,
                       libdnf.transaction.TransactionItemAction_REINSTALLED}
     cached_tsi = [tsi for tsi in swdb_transaction]
+    # pending revert items by nevra, built on the first element without a key
+    revert_tsis = None
     el_not_found = False
     error = False
     for rpm_el in rpm_transaction:
         te_nevra = _te_nevra(rpm_el)
         tsi = rpm_el.Key()
         if tsi is None or not hasattr(tsi, "pkg"):
-            for tsi_candidate in cached_tsi:
-                if tsi_candidate.state != libdnf.transaction.TransactionItemState_UNKNOWN:
-                    continue
-                if tsi_candidate.action not in revert_actions:
-                    continue
-                if str(tsi_candidate) == te_nevra:
+            if revert_tsis is None:
+                revert_tsis = {}
+                for tsi_candidate in cached_tsi:
+                    if tsi_candidate.action in revert_actions:
+                        revert_tsis.setdefault(str(tsi_candidate), []).append(tsi_candidate)
+            for tsi_candidate in revert_tsis.get(te_nevra, ()):
+                if tsi_candidate.state == libdnf.transaction.TransactionItemState_UNKNOWN:
                     tsi = tsi_candidate
                     break
         if tsi is None or not hasattr(tsi, "pkg"):
@@ -0,0 +1,42 @@
+#!/usr/bin/python3
+
+# Time dnf.i18n.exact_width() and fill_exact_width() on the kind of strings
+# "dnf list" and "dnf history list" print: mostly ASCII package NEVRAs with
+# a few non-ASCII (e.g. translated or CJK) ones mixed in.
+#
+# usage (from the top of the source tree):
+#   PYTHONPATH=. python3 scripts/benchmark_exact_width.py [-n STRINGS] [-r REPEAT]
+
+import argparse
+import timeit
+
+import dnf.i18n
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-n', '--strings', type=int, default=10000,
+                        help='number of strings to measure')
+    parser.add_argument('-r', '--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    strings = ['package-%d-1.%d-1.fc33.x86_64' % (i, i % 7) for i in range(args.strings)]
+    # every 100th string is not ASCII
+    strings[::100] = ['balíček-重-%d' % i for i in range(len(strings[::100]))]
+
+    def widths():
+        for msg in strings:
+            dnf.i18n.exact_width(msg)
+
+    def fills():
+        for msg in strings:
+            dnf.i18n.fill_exact_width(msg, 40, 40)
+
+    for name, func in (('exact_width', widths), ('fill_exact_width', fills)):
+        times = timeit.repeat(func, number=1, repeat=args.repeat)
+        print('%s of %d strings: best %.4fs, worst %.4fs'
+              % (name, len(strings), min(times), max(times)))
+
+
+if __name__ == '__main__':
+    main()
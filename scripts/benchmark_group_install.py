@@ -0,0 +1,50 @@
+#!/usr/bin/python3
+
+# Time Base._finalize_comps_trans() for a large synthetic group install.
+#
+# The transaction lists every package of the test 'main' repository plus
+# a number of names that match nothing, which is what resolving comps
+# packages costs before the goal gets solved.
+#
+# usage (from the top of the source tree, with libdnf and libcomps installed):
+#   PYTHONPATH=. python3 scripts/benchmark_group_install.py [-n PACKAGES] [-r REPEAT]
+
+import argparse
+import logging
+import timeit
+
+import dnf.comps
+
+import tests.support
+
+
+def finalize(names):
+    base = tests.support.MockBase('main')
+    trans = dnf.comps.TransactionBunch()
+    trans.install = names
+    base._add_comps_trans(trans)
+    base._finalize_comps_trans()
+    return base
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-n', '--packages', type=int, default=1500,
+                        help='number of comps packages in the transaction')
+    parser.add_argument('-r', '--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    # "No match for group package" would be printed for every missing name
+    logging.getLogger('dnf').setLevel(logging.CRITICAL)
+
+    base = tests.support.MockBase('main')
+    names = sorted(set(pkg.name for pkg in base.sack.query()))
+    names += ['missing-%d' % i for i in range(max(args.packages - len(names), 0))]
+
+    times = timeit.repeat(lambda: finalize(names), number=1, repeat=args.repeat)
+    print('%d comps packages: best %.3fs, worst %.3fs'
+          % (len(names), min(times), max(times)))
+
+
+if __name__ == '__main__':
+    main()
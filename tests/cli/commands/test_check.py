@@ -0,0 +1,226 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (C) 2020 Red Hat, Inc.
+#
+# This copyrighted material is made available to anyone wishing to use,
+# modify, copy, or redistribute it subject to the terms and conditions of
+# the GNU General Public License v.2, or (at your option) any later version.
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY expressed or implied, including the implied warranties of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General
+# Public License for more details.  You should have received a copy of the
+# GNU General Public License along with this program; if not, write to the
+# Free Software Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA
+# 02110-1301, USA.  Any Red Hat trademarks that are incorporated in the
+# source code or documentation are not subject to the GNU General Public
+# License and may only be used or replicated with the express permission of
+# Red Hat, Inc.
+#
+
+from __future__ import absolute_import
+from __future__ import unicode_literals
+
+import libdnf.transaction
+
+import dnf.cli.commands.check
+import dnf.exceptions
+
+import tests.support
+from tests.support import mock
+
+
+class FakeSelector(object):
+
+    def __init__(self, sack):
+        self.dep = None
+
+    def set(self, provides):
+        self.dep = provides
+        return self
+
+
+class FakeGoal(object):
+
+    satisfiable = set()
+    runs = []
+
+    def __init__(self, sack):
+        self.deps = []
+
+    def install(self, select, optional):
+        self.deps.append(select.dep)
+
+    def run(self):
+        FakeGoal.runs.append(sorted(self.deps))
+        return all(dep in FakeGoal.satisfiable for dep in self.deps)
+
+
+class CheckCommandTest(tests.support.DnfBaseTestCase):
+
+    REPOS = []
+    BASE_CLI = True
+    CLI = "mock"
+
+    def setUp(self):
+        super(CheckCommandTest, self).setUp()
+        self.cmd = dnf.cli.commands.check.CheckCommand(self.cli)
+        FakeGoal.runs = []
+
+    def _run(self, args):
+        tests.support.command_configure(self.cmd, args)
+        with tests.support.patch_std_streams() as (stdout, _):
+            try:
+                self.cmd.run()
+            except dnf.exceptions.Error:
+                pass
+        return stdout.getvalue().splitlines()
+
+    def test_all(self):
+        # every check has to look at all the packages, not just the duplicates
+        self.assertEqual(self._run(['--all']), [
+            'dup-1-0.noarch is a duplicate with dup-2-0.noarch',
+            'dup-1-0.noarch is a duplicate with dup-3-0.noarch',
+            'test-1-0.noarch is obsoleted by obs-3-0.noarch',
+        ])
+
+    @mock.patch('dnf.sack.rpmdb_sack')
+    @mock.patch('dnf.selector.Selector', FakeSelector)
+    @mock.patch('dnf.goal.Goal', FakeGoal)
+    def test_satisfiable_rich_deps_batched(self, _rpmdb_sack):
+        deps = {'(a if b)', '(c or d)'}
+        FakeGoal.satisfiable = set(deps)
+        self.assertEqual(self.cmd._satisfiable_rich_deps(deps), deps)
+        self.assertEqual(FakeGoal.runs, [sorted(deps)])
+
+    @mock.patch('dnf.sack.rpmdb_sack')
+    @mock.patch('dnf.selector.Selector', FakeSelector)
+    @mock.patch('dnf.goal.Goal', FakeGoal)
+    def test_satisfiable_rich_deps_one_by_one(self, _rpmdb_sack):
+        FakeGoal.satisfiable = {'(a if b)'}
+        self.assertEqual(self.cmd._satisfiable_rich_deps({'(a if b)', '(c or d)'}), {'(a if b)'})
+        self.assertLength(FakeGoal.runs, 3)
+        self.assertEmpty(self.cmd._satisfiable_rich_deps(set()))
+        self.assertLength(FakeGoal.runs, 3)
+
+    def test_requires_resolved_once(self):
+        tests.support.command_configure(self.cmd, ['--dependencies'])
+        q = self.base.sack.query().installed()
+        pepper = q.filter(name='pepper')[0]
+        wrapped_q = mock.Mock(wraps=q)
+        problems, depends_on, rich_requires = self.cmd._check_packages(wrapped_q, [pepper, pepper])
+        self.assertEqual(wrapped_q.filter.call_count, 1)
+        self.assertEmpty(problems)
+        self.assertEqual(depends_on, {'pepper': {'librita'}})
+        self.assertEmpty(rich_requires)
+
+    def test_conflicts_resolved_once(self):
+        tests.support.command_configure(self.cmd, ['--dependencies'])
+        pkgs = [tests.support.mock_package(name, regular_requires=[], requires_pre=[],
+                                           prereq_ignoreinst=[], conflicts=['hole'])
+                for name in ('foo', 'bar')]
+        wrapped_q = mock.Mock(wraps=self.base.sack.query().installed())
+        problems, _, _ = self.cmd._check_packages(wrapped_q, pkgs)
+        self.assertEqual(wrapped_q.filter.call_count, 1)
+        self.assertEqual(sorted(problems), ['bar', 'foo'])
+
+    def test_rich_requires(self):
+        tests.support.command_configure(self.cmd, ['--dependencies'])
+        pkg = tests.support.mock_package('foo', regular_requires=['(a if b)'], requires_pre=[],
+                                         prereq_ignoreinst=[], conflicts=[])
+        q = mock.Mock()
+        q.filter.return_value.run.return_value = []
+        with mock.patch.object(self.cmd, '_satisfiable_rich_deps', return_value={'(a if b)'}):
+            problems, depends_on, rich_requires = self.cmd._check_packages(q, [pkg])
+        # satisfied without any provider, but b can change that
+        self.assertEmpty(problems)
+        self.assertEqual(depends_on, {'foo': set()})
+        self.assertEqual(rich_requires, {'foo'})
+
+    def test_format_problem(self):
+        problem = ('{} is obsoleted by {}', ('test-1-0.noarch', 'obs-3-0.noarch'))
+        with mock.patch.object(self.base.output.term, 'bold', lambda s: '*%s*' % s):
+            self.assertEqual(self.cmd._format_problem(problem),
+                             '*test-1-0.noarch* is obsoleted by *obs-3-0.noarch*')
+
+
+class IncrementalCheckTest(tests.support.DnfBaseTestCase):
+
+    REPOS = []
+    BASE_CLI = True
+    CLI = "mock"
+
+    def setUp(self):
+        super(IncrementalCheckTest, self).setUp()
+        self.cmd = dnf.cli.commands.check.CheckCommand(self.cli)
+
+    def _commit(self, beg_rpmdb_version, end_rpmdb_version, name):
+        pkg = self.base.sack.query().installed().filter(name=name)[0]
+        self.history.rpm.add_install(pkg)
+        self.history.beg(beg_rpmdb_version, [], [])
+        for tsi in self.history._swdb.getItems():
+            tsi.setState(libdnf.transaction.TransactionItemState_DONE)
+        self.history.end(end_rpmdb_version)
+        self.history.close()
+        return self.history.last().tid
+
+    def _state(self, rpmdb_version, tid=0):
+        return {'format': dnf.cli.commands.check._STATE_FORMAT, 'check_types': ['all'],
+                'rpmdb_version': rpmdb_version, 'tid': tid}
+
+    def test_changed_since(self):
+        tid = self._commit('A', 'B', 'pepper')
+        last_tid = self._commit('B', 'C', 'hole')
+        tests.support.command_configure(self.cmd, ['--incremental'])
+        self.assertEqual(self.cmd._changed_since(self._state('A'), 'C'), {'pepper', 'hole'})
+        self.assertEqual(self.cmd._changed_since(self._state('B', tid), 'C'), {'hole'})
+        self.assertEqual(self.cmd._changed_since(self._state('C', last_tid), 'C'), set())
+
+    def test_changed_since_broken_chain(self):
+        self._commit('A', 'B', 'pepper')
+        last_tid = self._commit('X', 'C', 'hole')
+        tests.support.command_configure(self.cmd, ['--incremental'])
+        # the rpmdb changed outside of dnf between the transactions
+        self.assertIsNone(self.cmd._changed_since(self._state('A'), 'C'))
+        # ... or after the last one
+        self.assertIsNone(self.cmd._changed_since(self._state('C', last_tid), 'D'))
+        # the stored check looked for other problems
+        state = dict(self._state('C', last_tid), check_types=['duplicates'])
+        self.assertIsNone(self.cmd._changed_since(state, 'C'))
+        self.assertIsNone(self.cmd._changed_since(None, 'C'))
+        # the stored check was saved in an older format
+        state = dict(self._state('C', last_tid), format=None)
+        self.assertIsNone(self.cmd._changed_since(state, 'C'))
+
+    @mock.patch('dnf.Base._ts', new_callable=mock.PropertyMock)
+    @mock.patch('dnf.persistor.CheckPersistor')
+    def test_recheck(self, persistor, _ts):
+        persistor.return_value.get_last_check.return_value = {
+            'format': dnf.cli.commands.check._STATE_FORMAT,
+            'check_types': ['dependencies'], 'rpmdb_version': 'A', 'tid': 0,
+            'problems': {'tour': [['stale {}', ['problem']]], 'hole': [['kept {}', ['problem']]]},
+            'depends_on': {'pepper': ['librita'], 'hole': []},
+            'rich_requires': ['obs'],
+        }
+        checked = []
+        check_packages = self.cmd._check_packages
+
+        def check_and_record(q, pkgs):
+            checked.extend(pkg.name for pkg in pkgs)
+            return check_packages(q, pkgs)
+
+        self.cmd._check_packages = check_and_record
+        tests.support.command_configure(self.cmd, ['--dependencies', '--incremental'])
+        with mock.patch.object(self.cmd, '_changed_since', return_value={'librita'}), \
+                tests.support.patch_std_streams() as (stdout, _):
+            with self.assertRaises(dnf.exceptions.Error):
+                self.cmd.run()
+
+        # the changed package, the packages requiring it, the ones with rich
+        # requires and the ones with problems
+        self.assertEqual(set(checked), {'librita', 'pepper', 'tour', 'obs'})
+        self.assertEqual(stdout.getvalue(), 'kept problem\n')
+        state = persistor.return_value.save.call_args[0][0]
+        self.assertEqual(state['problems'], {'hole': [['kept {}', ['problem']]]})
+        self.assertEqual(state['depends_on']['pepper'], ['librita'])
+        self.assertEqual(state['depends_on']['hole'], [])
+        self.assertEqual(state['rich_requires'], [])
@@ -28,8 +28,10 @@ import tempfile
 
 import hawkey
 
-import dnf.pycomp
 import dnf.cli.commands.updateinfo
+import dnf.persistor
+import dnf.pycomp
+import dnf.query
 
 import tests.support
 from tests.support import mock
@@ -91,6 +93,43 @@ class UpdateInfoCommandTest(tests.support.DnfBaseTestCase):
             [('tour-5-1.noarch.rpm', 'DNF-2014-3', False)],
             'incorrect pairs')
 
+    def test_avail_cached(self):
+        """Test querying advisories stored in the cache."""
+        cmd = dnf.cli.commands.updateinfo.UpdateInfoCommand(self.cli)
+        tests.support.command_configure(cmd, [])
+        expected = [(apk.filename, adv.id, ins)
+                    for apk, adv, ins in cmd.available_apkg_adv_insts([])]
+        cmd = dnf.cli.commands.updateinfo.UpdateInfoCommand(self.cli)
+        tests.support.command_configure(cmd, [])
+        apkg_adv_insts = list(cmd.available_apkg_adv_insts([]))
+        self.assertTrue(all(isinstance(adv, dnf.persistor._CachedAdvisory)
+                            for _apk, adv, _ins in apkg_adv_insts))
+        self.assertCountEqual(
+            ((apk.filename, adv.id, ins) for apk, adv, ins in apkg_adv_insts),
+            expected, 'incorrect pairs')
+
+    def test_apkg_advisories(self):
+        """Test resolving every advisory only once."""
+        def apkg(name):
+            return tests.support.mock_package(name, evr='1-1', arch='noarch',
+                                              filename=name + '.rpm')
+
+        def advisory(aid, names):
+            return mock.Mock(id=aid, packages=[apkg(name) for name in names])
+
+        adv1 = advisory('ADV-1', ['a', 'shared'])
+        adv2 = advisory('ADV-2', ['shared', 'b'])
+        apackages = []
+        for name, adv in (('a', adv1), ('shared', adv1), ('shared', adv2), ('b', adv2)):
+            apackage = apkg(name)
+            apackage.get_advisory.return_value = adv
+            apackages.append(apackage)
+
+        pairs = list(dnf.query._apkg_advisories(self.base.sack, apackages))
+        self.assertEqual([(apk.name, adv.id) for apk, adv in pairs],
+                         [('a', 'ADV-1'), ('shared', 'ADV-1'), ('shared', 'ADV-2'), ('b', 'ADV-2')])
+        self.assertEqual(sum(apk.get_advisory.call_count for apk in apackages), 2)
+
     def test_inst(self):
         """Test installed triplets querying."""
         cmd = dnf.cli.commands.updateinfo.UpdateInfoCommand(self.cli)
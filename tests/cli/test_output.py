@@ -119,6 +119,19 @@ class OutputTest(tests.support.DnfBaseTestCase):
         self.assertEqual(self.output.list_transaction(transaction),
                          LIST_TRANSACTION_OUTPUT)
 
+    @mock.patch('dnf.cli.output._', dnf.pycomp.NullTranslations().ugettext)
+    @mock.patch('dnf.cli.output.P_', dnf.pycomp.NullTranslations().ungettext)
+    @mock.patch('dnf.cli.term._real_term_width', return_value=80)
+    def test_list_transaction_replacing(self, _real_term_width):
+        self.base.upgrade('hole')
+        self.base.resolve()
+        lines = self.output.list_transaction(self.base.transaction).splitlines()
+        self.assertIn('Upgrading:', lines)
+        replacing = [line for line in lines if 'replacing' in line]
+        self.assertLength(replacing, 1)
+        self.assertIn('tour', replacing[0])
+        self.assertIn('Upgrade  1 Package', lines)
+
     @mock.patch('dnf.cli.output._', dnf.pycomp.NullTranslations().ugettext)
     @mock.patch('dnf.i18n.ucd_input')
     def test_userconfirm(self, input_fnc):
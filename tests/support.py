@@ -215,6 +215,13 @@ def mock_logger():
     return mock.create_autospec(logger)
 
 
+def mock_package(name, **kwargs):
+    """Create a Mock package named `name`, other attributes set from `kwargs`."""
+    pkg = mock.Mock(**kwargs)
+    pkg.name = name  # the name keyword means something else to Mock
+    return pkg
+
+
 class _BaseStubMixin(object):
     """A reusable class for creating `dnf.Base` stubs.
 
@@ -29,6 +29,7 @@ import libdnf.transaction
 import rpm
 
 import dnf
+import dnf.db.history
 import dnf.exceptions
 import dnf.package
 import dnf.subject
@@ -229,6 +230,15 @@ class VerifyTransactionTest(tests.support.DnfBaseTestCase):
         self.assertEqual(pkg.action_name, "Install")
         self.assertEqual(pkg.get_reason(), libdnf.transaction.TransactionItemReason_USER)
 
+    @mock.patch('dnf.sack.rpmdb_sack')
+    def test_verify_transaction_without_groups(self, rpmdb_sack):
+        removed_pkg = self.base.sack.query().available().filter(name="mrkite")[0]
+        removed_pkg._force_swdb_repoid = "main"
+        self.history.rpm.add_remove(removed_pkg)
+        self._swdb_begin()
+        self.base._verify_transaction()
+        rpmdb_sack.assert_not_called()
+
 
 class InstallReasonTest(tests.support.ResultTestCase):
 
@@ -300,3 +310,17 @@ class Goal2TransactionTest(tests.support.DnfBaseTestCase):
         tsi = tsis[2]
         self.assertEqual(str(tsi.pkg), "tour-5-0.noarch")
         self.assertEqual(tsi.action, libdnf.transaction.TransactionItemAction_OBSOLETED)
+
+    def test_reasons_resolved_once(self):
+        ts = self.history.rpm
+        pkg = self.sack.query().installed().filter(name="pepper")[0]
+        swdb = mock.Mock()
+        swdb.resolveRPMTransactionItemReason.return_value = \
+            libdnf.transaction.TransactionItemReason_USER
+        with mock.patch.object(dnf.db.history.SwdbInterface, 'swdb', swdb):
+            with ts._cached_reasons():
+                for _ in range(3):
+                    self.assertEqual(ts.get_reason(pkg),
+                                     libdnf.transaction.TransactionItemReason_USER)
+            ts.get_reason(pkg)
+        self.assertEqual(swdb.resolveRPMTransactionItemReason.call_count, 2)
@@ -60,6 +60,33 @@ class CompsTest(tests.support.TestCase):
         group = dnf.util.first(comps.groups_by_pattern('Base'))
         self.assertIsInstance(group, dnf.comps.Group)
 
+    def test_by_pattern_indexed(self):
+        comps = self.comps
+        self.assertEqual([g.id for g in comps.groups_by_pattern('solid ground')],
+                         ['somerset'])
+        self.assertEmpty(comps.groups_by_pattern('solid ground', True))
+        self.assertEmpty(comps.groups_by_pattern('no-such-group'))
+        env = comps.environment_by_pattern('sugar-desktop-environment')
+        self.assertIs(env, comps._environment_by_id('sugar-desktop-environment'))
+
+    def test_cached_wrappers(self):
+        comps = self.comps
+        group = comps._group_by_id('somerset')
+        self.assertIs(comps._group_by_id('somerset'), group)
+        self.assertIn(group, comps.groups)
+        self.assertIsNone(comps._group_by_id('no-such-group'))
+        self.assertIsNot(comps.groups, comps.groups)
+
+        comps._add_from_xml_filename(tests.support.COMPS_PATH)
+        self.assertIsNot(comps._group_by_id('somerset'), group)
+
+    def test_group_ids_by_package_name(self):
+        index = self.comps._group_ids_by_package_name()
+        self.assertEqual(index['pepper'], {'base', 'somerset'})
+        self.assertEqual(index['lotus'], {'somerset', 'Peppers', 'broken-group'})
+        self.assertNotIn('no-such-package', index)
+        self.assertIs(self.comps._group_ids_by_package_name(), index)
+
     def test_categories(self):
         cat = self.comps.categories[0]
         self.assertEqual(cat.name_by_lang['cs'], u'Základ systému')
@@ -216,6 +243,24 @@ class SolverGroupTest(tests.support.DnfBaseTestCase):
         # tour appears only in one group now
         self.assertTrue(self.solver._removable_pkg('tour'))
 
+        # the installed groups are loaded from swdb once, until the next change
+        with mock.patch.object(self.history.group, '_get_installed_objs',
+                               wraps=self.history.group._get_installed_objs) as load:
+            self.history.group._swdb_owners = None
+            self.assertTrue(self.solver._removable_pkg('tour'))
+            self.assertFalse(self.solver._removable_pkg('pepper-not-in-history'))
+            self.assertEqual(load.call_count, 1)
+            self.history.group.install(swdb_group)
+            self.assertFalse(self.solver._removable_pkg('tour'))
+            self.assertEqual(load.call_count, 2)
+
+        # members added to a group after it was installed are taken into account
+        swdb_group = self.history.group.new('late', 'late', 'late', dnf.comps.DEFAULT)
+        self.history.group.install(swdb_group)
+        self.assertTrue(self.solver._removable_pkg('pepper'))
+        swdb_group.addPackage('pepper', True, dnf.comps.MANDATORY)
+        self.assertFalse(self.solver._removable_pkg('pepper'))
+
     def test_remove(self):
         grp = self.comps.group_by_pattern('base')
         self.solver._group_install(grp.id, dnf.comps.MANDATORY, [])
@@ -53,6 +53,20 @@ class EmptyPersistorTest(tests.support.ResultTestCase):
         self.assertCountEqual(map(str, installed), ('trampoline-2.1-1.noarch',))
         self.assertEmpty(removed)
 
+    def test_finalize_comps_trans_many(self):
+        trans = dnf.comps.TransactionBunch()
+        trans.install = ('trampoline', 'no-such-package')
+        trans.install_opt = ('tour',)
+        trans.upgrade = ('pepper',)
+        self.base._add_comps_trans(trans)
+        self.base._finalize_comps_trans()
+        self.assertCountEqual(self.base._goal.group_members,
+                              ('trampoline', 'tour', 'pepper'))
+        (installed, removed) = self.installed_removed(self.base)
+        # tour and pepper are installed already
+        self.assertCountEqual(map(str, installed), ('trampoline-2.1-1.noarch',))
+        self.assertEmpty(removed)
+
 
 class PresetPersistorTest(tests.support.ResultTestCase):
     """Test group operations with some data in the persistor."""
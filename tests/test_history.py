@@ -20,9 +20,14 @@
 from __future__ import absolute_import
 from __future__ import unicode_literals
 
+import os
+import shutil
+import tempfile
+
 import libdnf.transaction
 
 import dnf.history
+import dnf.transaction_sr
 
 import tests.support
 from tests.support import mock
@@ -503,3 +508,183 @@ class TransactionConverterTest(tests.support.TestCase):
             yield (item.op_type, item.installed, item.erased, item.obsoleted,
                    item.reason)
 '''
+
+
+class OldTest(tests.support.DnfBaseTestCase):
+
+    REPOS = []
+
+    def setUp(self):
+        super(OldTest, self).setUp()
+        for _ in range(3):
+            self._swdb_commit()
+        self.tids = [trans.tid for trans in self.history.old()]
+
+    def test_all(self):
+        self.assertLength(self.tids, 3)
+        self.assertEqual(self.tids, sorted(self.tids, reverse=True))
+
+    def test_tids(self):
+        old = self.history.old([str(self.tids[1])])
+        self.assertEqual([trans.tid for trans in old], [self.tids[1]])
+
+    def test_limit(self):
+        old = self.history.old(limit=2)
+        self.assertEqual([trans.tid for trans in old], self.tids[:2])
+        old = self.history.old(self.tids[1:], limit=1)
+        self.assertEqual([trans.tid for trans in old], [self.tids[1]])
+
+
+class SerializeTransactionRangeTest(tests.support.TestCase):
+
+    @staticmethod
+    def _tsi(action, nevra):
+        name, arch = nevra.split('-')[0], nevra.rsplit('.', 1)[1]
+        evr = nevra[len(name) + 1:-len(arch) - 1]
+        return tests.support.mock_package(
+            name, is_package=lambda: True, action=action, nevra=nevra, arch=arch, evr=evr,
+            reason=libdnf.transaction.TransactionItemReason_USER, from_repo='main')
+
+    def _trans(self, tid, *tsis):
+        return mock.Mock(tid=tid, packages=lambda: list(tsis))
+
+    def test_net_effect(self):
+        A = libdnf.transaction
+        transactions = [
+            self._trans(1,
+                        self._tsi(A.TransactionItemAction_UPGRADE, 'pepper-2-1.x86_64'),
+                        self._tsi(A.TransactionItemAction_UPGRADED, 'pepper-1-1.x86_64'),
+                        self._tsi(A.TransactionItemAction_INSTALL, 'tour-1-1.noarch')),
+            self._trans(2,
+                        self._tsi(A.TransactionItemAction_UPGRADE, 'pepper-3-1.x86_64'),
+                        self._tsi(A.TransactionItemAction_UPGRADED, 'pepper-2-1.x86_64'),
+                        self._tsi(A.TransactionItemAction_REMOVE, 'tour-1-1.noarch'),
+                        self._tsi(A.TransactionItemAction_REMOVE, 'lotus-3-16.x86_64')),
+        ]
+        data = dnf.transaction_sr.serialize_transaction_range(
+            reversed(transactions), lambda evr1, evr2: (evr1 > evr2) - (evr1 < evr2))
+        self.assertEqual([(rpm['action'], rpm['nevra']) for rpm in data['rpms']], [
+            ('Removed', 'lotus-3-16.x86_64'),
+            ('Upgraded', 'pepper-1-1.x86_64'),
+            ('Upgrade', 'pepper-3-1.x86_64'),
+        ])
+        self.assertNotIn('groups', data)
+
+    @staticmethod
+    def _comps_tsi(action, kind, id_):
+        A = libdnf.transaction
+        comps_item = mock.Mock(
+            getGroupId=lambda: id_, getEnvironmentId=lambda: id_,
+            getPackages=lambda: [], getGroups=lambda: [],
+            getPackageTypes=lambda: A.CompsPackageType_DEFAULT)
+        action_name = {A.TransactionItemAction_INSTALL: 'Install',
+                       A.TransactionItemAction_REMOVE: 'Removed',
+                       A.TransactionItemAction_UPGRADE: 'Upgrade'}[action]
+        return mock.Mock(
+            is_package=lambda: False, is_group=lambda: kind == 'group',
+            is_environment=lambda: kind == 'environment', action=action,
+            action_name=action_name, get_group=lambda: comps_item,
+            get_environment=lambda: comps_item)
+
+    def test_comps_net_effect(self):
+        A = libdnf.transaction
+        transactions = [
+            self._trans(1,
+                        self._comps_tsi(A.TransactionItemAction_INSTALL, 'group', 'temporary'),
+                        self._comps_tsi(A.TransactionItemAction_REMOVE, 'group', 'reinstalled'),
+                        self._comps_tsi(A.TransactionItemAction_INSTALL, 'group', 'new'),
+                        self._comps_tsi(A.TransactionItemAction_UPGRADE, 'environment', 'upgraded'),
+                        self._comps_tsi(A.TransactionItemAction_REMOVE, 'environment', 'gone')),
+            self._trans(2,
+                        self._comps_tsi(A.TransactionItemAction_REMOVE, 'group', 'temporary'),
+                        self._comps_tsi(A.TransactionItemAction_INSTALL, 'group', 'reinstalled'),
+                        self._comps_tsi(A.TransactionItemAction_UPGRADE, 'group', 'new'),
+                        self._comps_tsi(A.TransactionItemAction_INSTALL, 'environment', 'added')),
+        ]
+        data = dnf.transaction_sr.serialize_transaction_range(transactions, None)
+        self.assertNotIn('rpms', data)
+        self.assertEqual([(group['action'], group['id']) for group in data['groups']], [
+            ('Install', 'new'),
+            ('Upgrade', 'reinstalled'),
+        ])
+        self.assertEqual([(env['action'], env['id']) for env in data['environments']], [
+            ('Install', 'added'),
+            ('Removed', 'gone'),
+            ('Upgrade', 'upgraded'),
+        ])
+
+
+class CompactTransactionTest(tests.support.TestCase):
+
+    DATA = {'version': dnf.transaction_sr.VERSION, 'rpms': [
+        {'action': 'Upgrade', 'nevra': 'pepper-1:2-1.x86_64', 'reason': 'user', 'repo_id': 'main'},
+        {'action': 'Upgraded', 'nevra': 'pepper-1:1-1.x86_64', 'reason': 'user', 'repo_id': '@System'},
+        {'action': 'Install', 'nevra': 'not-a-nevra', 'reason': 'dependency', 'repo_id': 'main'},
+    ]}
+
+    def test_roundtrip(self):
+        compact = dnf.transaction_sr.compact_transaction(self.DATA)
+        upgrade, upgraded = compact['rpms'][:2]
+        self.assertEqual(upgrade[1], upgraded[1])  # name
+        self.assertNotEqual(upgrade[2], upgraded[2])  # evr
+        self.assertEqual(upgrade[3], upgraded[3])  # arch
+        self.assertEqual(compact['strings'][upgrade[2]], '1:2-1')
+        self.assertEqual(compact['rpms'][2][2:4], [None, None])
+        self.assertEqual(len(compact['strings']), len(set(compact['strings'])))
+        self.assertEqual(dnf.transaction_sr.expand_transaction(compact), self.DATA)
+
+    def test_invalid(self):
+        compact = dnf.transaction_sr.compact_transaction(self.DATA)
+        compact['rpms'][0][0] = len(compact['strings'])
+        with self.assertRaises(dnf.transaction_sr.TransactionError):
+            dnf.transaction_sr.expand_transaction(compact)
+
+    def test_negative_index(self):
+        compact = dnf.transaction_sr.compact_transaction(self.DATA)
+        compact['rpms'][0][0] = -1
+        with self.assertRaises(dnf.transaction_sr.TransactionError):
+            dnf.transaction_sr.expand_transaction(compact)
+
+
+class TransactionReplayTest(tests.support.ResultTestCase):
+
+    REPOS = ['main']
+
+    def _rpm(self, action, nevra, repo_id='main'):
+        return {'action': action, 'nevra': nevra, 'repo_id': repo_id, 'reason': 'user'}
+
+    def test_replay(self):
+        data = {'version': dnf.transaction_sr.VERSION, 'rpms': [
+            self._rpm('Install', 'trampoline-2.1-1.noarch'),
+            self._rpm('Removed', 'pepper-20-0.x86_64', '@System'),
+        ]}
+        replay = dnf.transaction_sr.TransactionReplay(self.base, data=data)
+        replay.run()
+        installed, removed = self.installed_removed(self.base)
+        self.assertEqual([str(pkg) for pkg in installed], ['trampoline-2.1-1.noarch'])
+        self.assertEqual([str(pkg) for pkg in removed], ['pepper-20-0.x86_64'])
+
+    def test_errors_reported_together(self):
+        data = {'version': dnf.transaction_sr.VERSION, 'rpms': [
+            self._rpm('Install', 'no-such-package-1-1.noarch'),
+            self._rpm('Install', 'not a nevra'),
+            self._rpm('Install', 'trampoline-2.1-1.noarch'),
+        ]}
+        replay = dnf.transaction_sr.TransactionReplay(self.base, data=data)
+        with self.assertRaises(dnf.transaction_sr.TransactionReplayError) as ctx:
+            replay.run()
+        self.assertLength(ctx.exception.errors, 2)
+
+    def test_compact_file(self):
+        data = {'version': dnf.transaction_sr.VERSION, 'rpms': [
+            self._rpm('Install', 'trampoline-2.1-1.noarch')]}
+        tmpdir = tempfile.mkdtemp(prefix='dnf_test_')
+        self.addCleanup(shutil.rmtree, tmpdir)
+        filename = os.path.join(tmpdir, 'transaction.json.gz')
+        dnf.transaction_sr.store_transaction(data, filename, compact=True)
+
+        replay = dnf.transaction_sr.TransactionReplay(self.base, filename=filename)
+        self.assertEqual(replay.get_data(), data)
+        replay.run()
+        installed, _ = self.installed_removed(self.base)
+        self.assertEqual([str(pkg) for pkg in installed], ['trampoline-2.1-1.noarch'])
@@ -136,6 +136,16 @@ class TestFormatedOutput(tests.support.TestCase):
 
     def test_exact_width(self):
         self.assertEqual(dnf.i18n.exact_width("重uř"), 4)
+        self.assertEqual(dnf.i18n.exact_width("重uř"), 4)  # cached
+        self.assertEqual(dnf.i18n.exact_width("pepper-20-0.x86_64"), 18)
+        self.assertEqual(dnf.i18n.exact_width(""), 0)
+
+    def test_chop_str(self):
+        self.assertEqual(dnf.i18n.chop_str("pepper", 3), (3, "pep"))
+        self.assertEqual(dnf.i18n.chop_str("pepper", 10), (6, "pepper"))
+        self.assertEqual(dnf.i18n.chop_str("pepper", 0), (0, ""))
+        self.assertEqual(dnf.i18n.chop_str("重uř", 3), (3, "重u"))
+        self.assertEqual(dnf.i18n.chop_str("重uř", 1), (0, ""))
 
     def test_textwrap_fill(self):
         msg = "12345 67890"
@@ -20,6 +20,7 @@
 from __future__ import absolute_import
 from __future__ import unicode_literals
 
+import os
 import tempfile
 
 import dnf.comps
@@ -31,6 +32,39 @@ import tests.support
 
 IDS = set(['one', 'two', 'three'])
 
+ARCH_COMPS = """<?xml version="1.0" encoding="UTF-8"?>
+<!DOCTYPE comps PUBLIC "-//Red Hat, Inc.//DTD Comps info//EN" "comps.dtd">
+<comps>
+  <group arch="x86_64">
+    <id>pepper</id>
+    <name>Pepper</name>
+    <packagelist>
+      <packagereq type="mandatory">hole</packagereq>
+      <packagereq type="mandatory" arch="ppc64">lotus</packagereq>
+    </packagelist>
+  </group>
+  <group arch="ppc64">
+    <id>ppc</id>
+    <name>PPC</name>
+    <packagelist>
+      <packagereq type="mandatory">tour</packagereq>
+    </packagelist>
+  </group>
+  <group>
+    <id>empty</id>
+    <name>Empty</name>
+  </group>
+  <category>
+    <id>empty-category</id>
+    <name>Empty category</name>
+  </category>
+  <environment>
+    <id>empty-environment</id>
+    <name>Empty environment</name>
+  </environment>
+</comps>
+"""
+
 
 class RepoPersistorTest(tests.support.TestCase):
     def setUp(self):
@@ -48,3 +82,79 @@ class RepoPersistorTest(tests.support.TestCase):
 
         persistor = dnf.persistor.RepoPersistor(self.persistdir)
         self.assertEqual(persistor.get_expired_repos(), IDS)
+
+
+class CheckPersistorTest(tests.support.TestCase):
+    def setUp(self):
+        self.persistdir = tempfile.mkdtemp(prefix="dnf-persistor-test-")
+        self.persistor = dnf.persistor.CheckPersistor(self.persistdir)
+
+    def tearDown(self):
+        dnf.util.rm_rf(self.persistdir)
+
+    def test_last_check(self):
+        self.assertIsNone(self.persistor.get_last_check())
+        state = {'rpmdb_version': 'abc', 'tid': 3, 'problems': {}, 'depends_on': {}}
+        self.assertTrue(self.persistor.save(state))
+
+        persistor = dnf.persistor.CheckPersistor(self.persistdir)
+        self.assertEqual(persistor.get_last_check(), state)
+
+
+class CompsPersistorTest(tests.support.TestCase):
+    def setUp(self):
+        self.persistdir = tempfile.mkdtemp(prefix="dnf-persistor-test-")
+        self.persistor = dnf.persistor.CompsPersistor(self.persistdir)
+
+    def tearDown(self):
+        dnf.util.rm_rf(self.persistdir)
+
+    def test_snapshot(self):
+        key = [['main', '/comps.xml.gz', 1, 2]]
+        self.assertIsNone(self.persistor.get(key))
+        comps = dnf.comps.Comps()
+        comps._add_from_xml_filename(tests.support.COMPS_PATH)
+        self.assertTrue(self.persistor.save(key, comps))
+
+        persistor = dnf.persistor.CompsPersistor(self.persistdir)
+        self.assertIsNone(persistor.get([['main', '/comps.xml.gz', 1, 3]]))
+        cached = dnf.comps.Comps()
+        cached._add_from_xml_filename(persistor.get(key))
+        self.assertEqual([g.id for g in cached.groups], [g.id for g in comps.groups])
+        self.assertEqual(len(cached), len(comps))
+
+    def test_snapshot_keeps_arch_and_empty_entries(self):
+        xml_path = os.path.join(self.persistdir, 'comps.xml')
+        with open(xml_path, 'w') as f:
+            f.write(ARCH_COMPS)
+        key = [['main', xml_path, 1, 2]]
+        comps = dnf.comps.Comps()
+        comps._add_from_xml_filename(xml_path)
+        self.assertTrue(self.persistor.save(key, comps))
+        cached = dnf.comps.Comps()
+        cached._add_from_xml_filename(self.persistor.get(key))
+
+        self.assertEqual(sorted(g.id for g in cached.groups), ['empty', 'pepper', 'ppc'])
+        self.assertEqual([c.id for c in cached.categories], ['empty-category'])
+        self.assertEqual([e.id for e in cached.environments], ['empty-environment'])
+        for c in (comps, cached):
+            c._arch_filter(['x86_64'])
+        self.assertEqual(sorted(g.id for g in cached.groups),
+                         sorted(g.id for g in comps.groups))
+        self.assertEqual(sorted(g.id for g in cached.groups), ['empty', 'pepper'])
+        self.assertEqual([p.name for p in cached._group_by_id('pepper').packages_iter()],
+                         [p.name for p in comps._group_by_id('pepper').packages_iter()])
+
+    def test_snapshot_replaced(self):
+        comps = dnf.comps.Comps()
+        comps._add_from_xml_filename(tests.support.COMPS_PATH)
+        old_key = [['main', '/comps.xml.gz', 1, 2]]
+        new_key = [['main', '/comps.xml.gz', 1, 3]]
+        self.assertTrue(self.persistor.save(old_key, comps))
+        old_path = self.persistor.get(old_key)
+        self.assertTrue(self.persistor.save(new_key, comps))
+        self.assertIsNone(self.persistor.get(old_key))
+        self.assertNotEqual(self.persistor.get(new_key), old_path)
+        self.assertFalse(os.path.exists(old_path))
+        self.assertEqual([f for f in os.listdir(self.persistdir) if f.endswith('.xml')],
+                         [os.path.basename(self.persistor.get(new_key))])
@@ -134,3 +134,41 @@ class DictsTest(tests.support.TestCase):
                 test_list.append(item)
 
         self.assertCountEqual(test_list, pkgs)
+
+
+class DependsTest(tests.support.TestCase):
+
+    def setUp(self):
+        self.sack = tests.support.mock_sack('main')
+
+    def test_filter_by_deps(self):
+        q = self.sack.query()
+        depquery = dnf.query._filter_by_deps(q, ["libri*", "tramp*"])
+        self.assertCountEqual(map(str, depquery),
+                              ["pepper-20-0.x86_64", "mrkite-2-0.x86_64"])
+
+    def test_filter_by_deps_glob(self):
+        q = self.sack.query()
+        for patterns in (["libri*"], ["librita"], ["trampoline", "l?brita"]):
+            expected = q.filter(empty=True)
+            for dep_type in dnf.query._DEPENDENCY_TYPES:
+                expected = expected.union(q.filter(**{dep_type + '__glob': patterns}))
+            self.assertCountEqual(dnf.query._filter_by_deps(q, patterns), expected)
+
+    def test_filter_by_deps_providers(self):
+        q = self.sack.query()
+        providers = q.filter(name="trampoline")
+        depquery = dnf.query._filter_by_deps(q, [], ("requires",), providers=providers)
+        self.assertCountEqual(map(str, depquery), ["mrkite-2-0.x86_64"])
+
+    def test_requires_closure(self):
+        q = self.sack.query()
+        closure = dnf.query.requires_closure(q, q.filter(name="trampoline"))
+        self.assertCountEqual(map(str, closure),
+                              ["trampoline-2.1-1.noarch", "mrkite-2-0.x86_64"])
+
+    def test_providers_closure(self):
+        q = self.sack.query()
+        closure = dnf.query.providers_closure(q, q.filter(name="mrkite"))
+        self.assertCountEqual(map(str, closure),
+                              ["mrkite-2-0.x86_64", "trampoline-2.1-1.noarch"])
@@ -53,6 +53,12 @@ EXPECTED_SOURCERPM_FORMAT = """\
 foo-1.0.1-1.f20.src.rpm"""
 
 
+EXPECTED_TREE_FORMAT = """\
+mrkite-0:2-0.x86_64
+ \\_ trampoline-0:2.1-1.noarch [0: ]
+"""
+
+
 class PkgStub(object):
     def __init__(self):
         self.arch = 'x86_64'
@@ -121,6 +127,48 @@ class SourceRPMFormatTest(tests.support.TestCase):
                          EXPECTED_SOURCERPM_FORMAT)
 
 
+class DeplistTest(tests.support.DnfBaseTestCase):
+
+    REPOS = ['main']
+    BASE_CLI = True
+    CLI = "stub"
+
+    def test_resolve_deplist_providers(self):
+        self.cmd = dnf.cli.commands.repoquery.RepoQueryCommand(self.cli)
+        tests.support.command_configure(self.cmd, ['--deplist'])
+        providers = self.cmd._resolve_deplist_providers({'trampoline', 'nothing-provides-this'})
+        self.assertEqual(providers, {
+            'trampoline': ['   provider: trampoline-2.1-1.noarch'],
+            'nothing-provides-this': []})
+
+    def test_deplists_resolved_lazily(self):
+        self.cmd = dnf.cli.commands.repoquery.RepoQueryCommand(self.cli)
+        tests.support.command_configure(self.cmd, ['--deplist'])
+        packages = sorted(self.base.sack.query().available().filter(name=['mrkite', 'pepper']))
+        with mock.patch.object(self.cmd, '_resolve_deplist_providers',
+                               wraps=self.cmd._resolve_deplist_providers) as resolve:
+            deplists = self.cmd._deplists(packages)
+            self.assertTrue(next(deplists).startswith('package: %s\n' % packages[0]))
+            self.assertEqual(resolve.call_count, 1)
+            self.assertLength(list(deplists), len(packages) - 1)
+        self.assertEqual(resolve.call_count, len(packages))
+
+
+class TreeTest(tests.support.DnfBaseTestCase):
+
+    REPOS = ['main']
+    BASE_CLI = True
+    CLI = "stub"
+
+    def test_tree_requires(self):
+        self.cmd = dnf.cli.commands.repoquery.RepoQueryCommand(self.cli)
+        tests.support.command_configure(self.cmd, ['--requires', '--tree'])
+        query = self.base.sack.query().filter(name='mrkite')
+        with tests.support.patch_std_streams() as (stdout, _):
+            self.cmd.tree_seed(query, query, self.cmd.opts)
+        self.assertEqual(stdout.getvalue(), EXPECTED_TREE_FORMAT)
+
+
 class OutputTest(tests.support.TestCase):
     def test_output(self):
         pkg = dnf.cli.commands.repoquery.PackageWrapper(PkgStub())
@@ -158,6 +206,45 @@ class OutputTest(tests.support.TestCase):
         self.assertEqual(fmt, "foobar | %{base} | {brackets}")
 
 
+class StreamedLinesTest(tests.support.TestCase):
+    def test_streamed_lines(self):
+        with tests.support.patch_std_streams() as (stdout, _):
+            lines = dnf.cli.commands.repoquery._StreamedLines("\n")
+            lines.update(['pepper', 'lotus', 'pepper'])
+            lines.add('tour')
+            lines.close()
+        self.assertEqual(stdout.getvalue(), "pepper\nlotus\ntour\n")
+
+    def test_streamed_lines_hash_collision(self):
+        class Line(str):
+            def __hash__(self):
+                return 0
+
+        with tests.support.patch_std_streams() as (stdout, _):
+            lines = dnf.cli.commands.repoquery._StreamedLines("\n\n")
+            lines.update([Line('package: pepper'), Line('package: lotus')])
+            lines.close()
+        self.assertEqual(stdout.getvalue(), "package: pepper\n\npackage: lotus\n")
+
+
+class CompileQueryformatTest(tests.support.TestCase):
+    def test_compile_queryformat(self):
+        render = dnf.cli.commands.repoquery._compile_queryformat(
+            '%{NAME}-%{version} %-12{arch}|%{buildtime} {%{base}}')
+        self.assertEqual(render(PkgStub()),
+                         'foobar-1.0.1       x86_64|1970-01-01 00:02 {%{base}}')
+
+    @mock.patch('dnf.cli.commands.repoquery._compile_queryformat',
+                wraps=dnf.cli.commands.repoquery._compile_queryformat)
+    def test_compile_queryformat_once(self, compile_queryformat):
+        cmd = dnf.cli.commands.repoquery.RepoQueryCommand(
+            tests.support.CliStub(tests.support.BaseCliStub()))
+        tests.support.command_configure(cmd, ['--qf', '%{name}'])
+        self.assertEqual(cmd.build_format_fn(cmd.opts, PkgStub()), 'foobar')
+        self.assertEqual(cmd.build_format_fn(cmd.opts, PkgStub()), 'foobar')
+        compile_queryformat.assert_called_once_with('%{name}')
+
+
 class Rpm2PyFormatTest(tests.support.TestCase):
     def test_rpm2py_format(self):
         fmt = dnf.cli.commands.repoquery.rpm2py_format('%{name}')
@@ -23,6 +23,8 @@ from __future__ import unicode_literals
 import operator
 import os
 
+import libdnf.transaction
+
 import dnf.util
 
 import tests.support
@@ -249,3 +251,35 @@ class TestMultiCall(tests.support.TestCase):
         l = dnf.util.MultiCallList([o1, o2])
         l.x = 5
         self.assertEqual([5, 5], list(map(operator.attrgetter('x'), [o1, o2])))
+
+
+class SyncRpmTransWithSwdbTest(tests.support.TestCase):
+
+    @staticmethod
+    def _te(nevra, key=None, failed=False):
+        name, version, release_arch = nevra.rsplit('-', 2)
+        release, arch = release_arch.rsplit('.', 1)
+        return mock.Mock(N=lambda: name, E=lambda: None, V=lambda: version,
+                         R=lambda: release, A=lambda: arch, Key=lambda: key,
+                         Failed=lambda: failed)
+
+    @staticmethod
+    def _tsi(nevra, action):
+        tsi = mock.MagicMock(action=action, state=libdnf.transaction.TransactionItemState_UNKNOWN)
+        tsi.__str__.return_value = nevra
+        return tsi
+
+    def test_revert_items_by_nevra(self):
+        upgraded = libdnf.transaction.TransactionItemAction_UPGRADED
+        first = self._tsi('pepper-20-0.x86_64', upgraded)
+        second = self._tsi('pepper-20-0.x86_64', upgraded)
+        install = self._tsi('tour-5-0.noarch', libdnf.transaction.TransactionItemAction_INSTALL)
+        rpm_transaction = [
+            self._te('tour-5-0.noarch', key=install),
+            self._te('pepper-20-0.x86_64'),
+            self._te('pepper-20-0.x86_64', failed=True),
+        ]
+        dnf.util._sync_rpm_trans_with_swdb(rpm_transaction, [first, install, second])
+        self.assertEqual(install.state, libdnf.transaction.TransactionItemState_DONE)
+        self.assertEqual(first.state, libdnf.transaction.TransactionItemState_DONE)
+        self.assertEqual(second.state, libdnf.transaction.TransactionItemState_ERROR)